@@ -0,0 +1,30 @@
+import pytest
+from django.core.cache import cache
+from store.celery import celery
+
+
+@pytest.fixture(autouse=True)
+def local_memory_cache(settings):
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def celery_eager():
+    previous = celery.conf.task_always_eager
+    celery.conf.task_always_eager = True
+    yield
+    celery.conf.task_always_eager = previous
+
+
+@pytest.fixture(autouse=True)
+def without_silk(settings):
+    # Silk's middleware writes a silk_request row for every request, which
+    # would need database access in every view test and would count against
+    # the query budgets in my_store/tests/conftest.py
+    settings.MIDDLEWARE = [middleware for middleware in settings.MIDDLEWARE
+                           if not middleware.startswith('silk.')]
@@ -0,0 +1,112 @@
+"""
+Write-behind buffer for LikeCount.
+
+Liking or unliking adds to a per-object delta in the cache and appends
+the object to a pending log. flush(), run by Celery beat, folds the
+deltas into LikeCount, so a popular object doesn't turn every like into
+an UPDATE of the same row. Reads add the deltas that are not flushed yet.
+"""
+from collections import defaultdict
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+SEQUENCE_KEY = 'likes:pending:seq'
+FLUSHED_KEY = 'likes:pending:flushed'
+LOCK_KEY = 'likes:flush:lock'
+MISSING_KEY = 'likes:pending:missing'
+
+
+def delta_key(label, object_id):
+    return f'likes:delta:{label}:{object_id}'
+
+
+def pending_key(seq):
+    return f'likes:pending:{seq}'
+
+
+def incr(key, delta):
+    # add() is a no-op when the key exists, so incr() never misses
+    cache.add(key, 0, timeout=None)
+    return cache.incr(key, delta)
+
+
+def record(model, object_id, delta):
+    label = model._meta.label_lower
+    # Delta first: a flush that reads the log entry must find the delta
+    incr(delta_key(label, object_id), delta)
+    seq = incr(SEQUENCE_KEY, 1)
+    cache.set(pending_key(seq), (label, object_id), timeout=None)
+
+
+def pending(model, ids):
+    keys = {delta_key(model._meta.label_lower, id): id for id in ids}
+    counts = {id: 0 for id in ids}
+    for key, delta in cache.get_many(keys).items():
+        counts[keys[key]] = delta
+    return counts
+
+
+async def apending(model, ids):
+    keys = {delta_key(model._meta.label_lower, id): id for id in ids}
+    counts = {id: 0 for id in ids}
+    for key, delta in (await cache.aget_many(keys)).items():
+        counts[keys[key]] = delta
+    return counts
+
+
+def flush(batch_size, lock_timeout=60):
+    """
+    Applies the deltas of up to batch_size pending log entries to LikeCount.
+    Returns ({model label: [object ids]} of the counts that changed, number
+    of log entries read).
+    """
+    from .models import LikeCount
+
+    if not cache.add(LOCK_KEY, 1, timeout=lock_timeout):
+        return {}, 0
+    try:
+        flushed = cache.get(FLUSHED_KEY, 0)
+        last = min(cache.get(SEQUENCE_KEY, 0), flushed + batch_size)
+        entries = cache.get_many(
+            [pending_key(seq) for seq in range(flushed + 1, last + 1)])
+        # record() takes its sequence number before it writes the entry, so
+        # a missing entry is usually still being written: stop before it.
+        # One still missing at the next flush belongs to a record() that
+        # died, and is skipped.
+        missing = cache.get(MISSING_KEY)
+        for seq in range(flushed + 1, last + 1):
+            if pending_key(seq) not in entries and seq != missing:
+                cache.set(MISSING_KEY, seq, timeout=None)
+                last = seq - 1
+                break
+        keys = [pending_key(seq) for seq in range(flushed + 1, last + 1)]
+        objects = {entries[key] for key in keys if key in entries}
+        deltas = cache.get_many([delta_key(*obj) for obj in objects])
+
+        applied = {}
+        with transaction.atomic():
+            for label, object_id in objects:
+                delta = deltas.get(delta_key(label, object_id))
+                if not delta:
+                    continue
+                content_type = ContentType.objects.get_by_natural_key(*label.split('.'))
+                counts = LikeCount.objects.filter(
+                    content_type=content_type, object_id=object_id)
+                if not counts.update(count=F('count') + delta):
+                    LikeCount.objects.create(content_type=content_type,
+                                             object_id=object_id, count=delta)
+                applied[label, object_id] = delta
+
+        # Only now that the counts are committed do the deltas shrink;
+        # likes recorded meanwhile stay in the delta for the next flush
+        changed = defaultdict(list)
+        for (label, object_id), delta in applied.items():
+            incr(delta_key(label, object_id), -delta)
+            changed[label].append(object_id)
+        cache.set(FLUSHED_KEY, last, timeout=None)
+        cache.delete_many(keys)
+        return dict(changed), len(keys)
+    finally:
+        cache.delete(LOCK_KEY)
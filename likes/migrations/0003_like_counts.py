@@ -0,0 +1,86 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_likes(apps, schema_editor):
+    LikedItem = apps.get_model("likes", "LikedItem")
+    duplicates = (
+        LikedItem.objects.values("user", "content_type", "object_id")
+        .annotate(keep=Min("id"), likes=Count("id"))
+        .filter(likes__gt=1)
+    )
+    for duplicate in duplicates:
+        LikedItem.objects.filter(
+            user=duplicate["user"],
+            content_type=duplicate["content_type"],
+            object_id=duplicate["object_id"],
+        ).exclude(id=duplicate["keep"]).delete()
+
+
+def count_likes(apps, schema_editor):
+    LikedItem = apps.get_model("likes", "LikedItem")
+    LikeCount = apps.get_model("likes", "LikeCount")
+    LikeCount.objects.bulk_create(
+        LikeCount(
+            content_type_id=row["content_type"],
+            object_id=row["object_id"],
+            count=row["count"],
+        )
+        for row in LikedItem.objects.values("content_type", "object_id")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("likes", "0002_likeditem_object_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LikeCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("object_id", models.PositiveIntegerField()),
+                ("count", models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(remove_duplicate_likes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="likeditem",
+            constraint=models.UniqueConstraint(
+                fields=("user", "content_type", "object_id"), name="unique_like"
+            ),
+        ),
+        migrations.AddField(
+            model_name="likecount",
+            name="content_type",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                to="contenttypes.contenttype",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="likecount",
+            constraint=models.UniqueConstraint(
+                fields=("content_type", "object_id"), name="unique_like_count"
+            ),
+        ),
+        migrations.RunPython(count_likes, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
+from . import counters
 
 
 class LikedItem(models.Model):
@@ -10,3 +11,61 @@ class LikedItem(models.Model):
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
     object_id = models.PositiveIntegerField()
     content_object = GenericForeignKey()
+
+    class Meta:
+        indexes = [models.Index(fields=['content_type', 'object_id'])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'content_type', 'object_id'], name='unique_like')
+        ]
+
+
+class LikeCountManager(models.Manager):
+    def stored_counts(self, model, ids):
+        opts = model._meta
+        return self.filter(
+            content_type__app_label=opts.app_label,
+            content_type__model=opts.model_name,
+            object_id__in=ids,
+        ).values_list('object_id', 'count')
+
+    def get_counts(self, model, ids):
+        """
+        Like counts for the given objects: one query for the flushed counts
+        plus one cache round trip for the increments not flushed yet.
+        """
+        counts = counters.pending(model, ids)
+        for object_id, count in self.stored_counts(model, ids):
+            counts[object_id] += count
+        return counts
+
+    async def aget_counts(self, model, ids):
+        counts = await counters.apending(model, ids)
+        async for object_id, count in self.stored_counts(model, ids):
+            counts[object_id] += count
+        return counts
+
+    def prefetch_counts(self, objects, to_attr='likes_count'):
+        objects = [obj for obj in objects if not hasattr(obj, to_attr)]
+        if not objects:
+            return
+        counts = self.get_counts(type(objects[0]), [obj.pk for obj in objects])
+        for obj in objects:
+            setattr(obj, to_attr, counts[obj.pk])
+
+
+class LikeCount(models.Model):
+    """
+    Number of LikedItem rows per object, written behind by
+    counters.flush() instead of counted on every read.
+    """
+    objects = LikeCountManager()
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['content_type', 'object_id'], name='unique_like_count')
+        ]
@@ -0,0 +1,4 @@
+from django.dispatch import Signal
+
+# Sent by flush_like_counts with sender=<model> and object_ids=[...]
+like_counts_flushed = Signal()
@@ -0,0 +1,25 @@
+import logging
+from celery import shared_task
+from django.apps import apps
+from django.conf import settings
+from . import counters
+from .signals import like_counts_flushed
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def flush_like_counts():
+    """
+    Writes the like increments buffered in the cache to LikeCount.
+    """
+    batch_size = settings.LIKE_COUNTS_FLUSH_BATCH_SIZE
+    changed, entries = counters.flush(batch_size)
+    for label, object_ids in changed.items():
+        like_counts_flushed.send_robust(apps.get_model(label),
+                                        object_ids=object_ids)
+
+    logger.info('Flushed %s like counts', sum(map(len, changed.values())))
+    if entries == batch_size:
+        flush_like_counts.delay()
+    return entries
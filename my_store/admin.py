@@ -1,9 +1,9 @@
 from django.contrib import admin, messages
-from django.db.models.aggregates import Count
 from django.db.models.query import QuerySet
 from django.utils.html import format_html, urlencode
 from django.urls import reverse
 from . import models
+from .caching import invalidate_products
 
 
 class InventoryFilter(admin.SimpleListFilter):
@@ -23,9 +23,13 @@ class ProductImageInline(admin.TabularInline):
     readonly_fields = ['thumbnail']
 
     def thumbnail(self, instance):
-        if instance.image.name != '':
-            return format_html(f'<img src="{instance.image.url}" class="thumbnail"/>')
-        return ''
+        if instance.image.name == '':
+            return ''
+        # Falls back to the original until the renditions are generated
+        rendition = instance.renditions.get('thumbnail')
+        url = instance.image.storage.url(rendition['image']) if rendition \
+            else instance.image.url
+        return format_html('<img src="{}" class="thumbnail"/>', url)
 
 
 @admin.register(models.Product)
@@ -53,6 +57,7 @@ class ProductAdmin(admin.ModelAdmin):
     @admin.action(description="Clear inventory")
     def clear_inventory(self, request, queryset):
         updated_count = queryset.update(inventory=0)
+        invalidate_products(queryset)
         self.message_user(
             request,
             f"{updated_count} products were successfully updated.",
@@ -82,13 +87,10 @@ class CollectionAdmin(admin.ModelAdmin):
             '<a href="{}">{} Products</a>', url, collection.products_count
         )
 
-    def get_queryset(self, request):
-        return super().get_queryset(request).annotate(products_count=Count("product"))
-
 
 @admin.register(models.Customer)
 class CustomerAdmin(admin.ModelAdmin):
-    list_display = ["first_name", "last_name", "membership", "orders"]
+    list_display = ["first_name", "last_name", "membership", "orders", "total_spent"]
     list_editable = ["membership"]
     list_per_page = 10
     list_select_related = ['user']
@@ -104,9 +106,6 @@ class CustomerAdmin(admin.ModelAdmin):
         )
         return format_html('<a href="{}">{} Orders</a>', url, customer.orders_count)
 
-    def get_queryset(self, request):
-        return super().get_queryset(request).annotate(orders_count=Count("order"))
-
 
 class OrderItemInline(admin.TabularInline):
     autocomplete_fields = ["product"]
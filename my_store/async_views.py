@@ -0,0 +1,165 @@
+"""
+Async, read-only versions of the hot GET endpoints, served under
+/store/async/. They return the same JSON as the DRF viewsets but run on the
+async ORM, so an ASGI worker can hold many slow clients without a thread
+per request.
+"""
+from math import isfinite
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from .fast_serializers import FastCartSerializer, FastProductSerializer
+from .models import Cart, Collection, Product, Review
+from .search import search_products, tokenize
+
+PRODUCT_ORDERING_FIELDS = ['unit_price', 'last_update']
+
+date = serializers.DateField()
+
+
+class BadRequest(Exception):
+    pass
+
+
+def render(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), status=status,
+                        content_type='application/json')
+
+
+def read_only(view):
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(['GET', 'HEAD'])
+        try:
+            return await view(request, *args, **kwargs)
+        except Http404:
+            return render({'detail': 'Not found.'}, status=404)
+        except BadRequest as error:
+            return render(error.args[0], status=400)
+    return wrapper
+
+
+async def paginate(request, queryset, to_representation):
+    """Same response shape as PageNumberPagination."""
+    page_size = api_settings.PAGE_SIZE
+    page = request.GET.get('page', '1')
+    if not page.isdigit() or int(page) < 1:
+        raise Http404
+    page = int(page)
+
+    count = await queryset.acount()
+    if page > 1 and (page - 1) * page_size >= count:
+        raise Http404
+    start = (page - 1) * page_size
+    rows = [row async for row in queryset[start:start + page_size]]
+
+    url = request.build_absolute_uri()
+    next_url = replace_query_param(url, 'page', page + 1) \
+        if start + page_size < count else None
+    previous_url = None
+    if page == 2:
+        previous_url = remove_query_param(url, 'page')
+    elif page > 2:
+        previous_url = replace_query_param(url, 'page', page - 1)
+    return {
+        'count': count,
+        'next': next_url,
+        'previous': previous_url,
+        'results': await to_representation(rows),
+    }
+
+
+def number(request, name):
+    value = request.GET.get(name)
+    if not value:
+        return None
+    try:
+        value = float(value)
+    except ValueError:
+        raise BadRequest({name: ['Enter a number.']})
+    # float() accepts nan and inf, which the sync view's filters reject
+    if not isfinite(value):
+        raise BadRequest({name: ['Enter a number.']})
+    return value
+
+
+def collection_representation(rows):
+    return [{'id': row['id'], 'title': row['title'],
+             'products_count': row['products_count']} for row in rows]
+
+
+def review_representation(rows):
+    return [{'id': row['id'], 'date': date.to_representation(row['date']),
+             'name': row['name'], 'description': row['description']} for row in rows]
+
+
+@read_only
+async def product_list(request):
+    queryset = Product.objects.with_price_with_tax()
+    filters = {
+        'collection_id': number(request, 'collection_id'),
+        'unit_price__gt': number(request, 'unit_price__gt'),
+        'unit_price__lt': number(request, 'unit_price__lt'),
+    }
+    queryset = queryset.filter(**{lookup: value for lookup, value
+                                  in filters.items() if value is not None})
+    words = tokenize([request.GET.get(api_settings.SEARCH_PARAM, '')])
+    if words:
+        queryset = search_products(queryset, words)
+    ordering = request.GET.get(api_settings.ORDERING_PARAM, '')
+    if ordering.lstrip('-') in PRODUCT_ORDERING_FIELDS:
+        queryset = queryset.order_by(ordering)
+
+    serializer = FastProductSerializer({'request': request})
+    return render(await paginate(request, serializer.get_rows(queryset),
+                                 serializer.ato_representation))
+
+
+@read_only
+async def product_detail(request, pk):
+    serializer = FastProductSerializer({'request': request})
+    rows = [row async for row in serializer.get_rows(
+        Product.objects.with_price_with_tax().filter(pk=pk))]
+    if not rows:
+        raise Http404
+    return render((await serializer.ato_representation(rows))[0])
+
+
+@read_only
+async def collection_list(request):
+    queryset = Collection.objects.values('id', 'title', 'products_count')
+
+    async def to_representation(rows):
+        return collection_representation(rows)
+    return render(await paginate(request, queryset, to_representation))
+
+
+@read_only
+async def collection_detail(request, pk):
+    rows = [row async for row in Collection.objects.filter(pk=pk)
+            .values('id', 'title', 'products_count')]
+    if not rows:
+        raise Http404
+    return render(collection_representation(rows)[0])
+
+
+@read_only
+async def review_list(request, product_pk):
+    queryset = Review.objects.filter(product_id=product_pk) \
+        .order_by('id').values('id', 'date', 'name', 'description')
+
+    async def to_representation(rows):
+        return review_representation(rows)
+    return render(await paginate(request, queryset, to_representation))
+
+
+@read_only
+async def cart_detail(request, pk):
+    serializer = FastCartSerializer({})
+    row = await Cart.objects.with_totals().filter(pk=pk) \
+        .values(*serializer.row_fields).afirst()
+    if row is None:
+        raise Http404
+    return render(await serializer.ato_representation(row))
@@ -0,0 +1,146 @@
+"""
+Bulk product import for ProductViewSet.bulk.
+
+Rows are validated with the ProductSerializer rules, with collections and
+existing products each loaded in one query up front. If every row is
+valid they are written with bulk_create/bulk_update in batches of
+BULK_IMPORT_BATCH_SIZE inside one transaction; otherwise nothing is
+written and the per-row errors are returned.
+"""
+import json
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from .caching import invalidate_collection, invalidate_products
+from .models import Collection, Product
+from .search import index_products
+from .serializers import ProductSerializer
+
+
+class NDJSONParser(BaseParser):
+    """One JSON object per line; parses to a list like a JSON array would."""
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        rows = []
+        if stream is None:
+            return rows
+        for number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                raise ParseError(f'Line {number} is not valid JSON.')
+        return rows
+
+
+class PreloadedCollectionField(serializers.PrimaryKeyRelatedField):
+    """Looks collections up in context['collections'] instead of querying."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool) or not isinstance(data, (int, str)):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return self.context['collections'][int(data)]
+        except (KeyError, ValueError):
+            self.fail('does_not_exist', pk_value=data)
+
+
+class BulkProductSerializer(ProductSerializer):
+    collection = PreloadedCollectionField(queryset=Collection.objects.all())
+
+
+def collection_id(row):
+    value = row.get('collection')
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def validate_rows(rows, existing, collections):
+    """Returns (products to create, products to update, updated fields, errors)."""
+    to_create, to_update, fields, errors = [], [], set(), []
+    # Building a serializer's fields costs more than validating a row, so
+    # one serializer per mode validates every row
+    context = {'collections': collections}
+    creator = BulkProductSerializer(data={}, context=context)
+    updater = BulkProductSerializer(data={}, partial=True, context=context)
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({'row': index, 'errors': {
+                'non_field_errors': ['Expected an object.']}})
+            continue
+        instance = None
+        if row.get('id') is not None:
+            instance = existing.get(row['id'])
+            if instance is None:
+                errors.append({'row': index, 'errors': {
+                    'id': [f'Product {row["id"]} does not exist.']}})
+                continue
+
+        serializer = creator if instance is None else updater
+        serializer.instance = instance
+        try:
+            validated_data = serializer.run_validation(row)
+        except serializers.ValidationError as error:
+            errors.append({'row': index, 'errors': error.detail})
+            continue
+
+        if instance is None:
+            to_create.append(Product(**validated_data))
+        else:
+            instance._previous_collection_id = instance.collection_id
+            for field, value in validated_data.items():
+                setattr(instance, field, value)
+            fields.update(validated_data)
+            to_update.append(instance)
+    return to_create, to_update, fields, errors
+
+
+def import_products(rows):
+    """
+    Creates rows without an id and updates rows with one. Returns
+    ({'created': n, 'updated': n}, None) or (None, errors).
+    """
+    batch_size = settings.BULK_IMPORT_BATCH_SIZE
+    ids = {row['id'] for row in rows
+           if isinstance(row, dict) and isinstance(row.get('id'), int)}
+    collection_ids = {collection_id(row) for row in rows if isinstance(row, dict)}
+    collections = Collection.objects.in_bulk(collection_ids - {None})
+
+    with transaction.atomic():
+        existing = Product.objects.select_for_update().in_bulk(ids)
+        to_create, to_update, fields, errors = validate_rows(rows, existing, collections)
+        if errors:
+            return None, errors
+
+        # Neither bulk method runs Product.save() or the signals, so the
+        # side effects they would have had are applied for the whole import
+        Product.objects.bulk_create(to_create, batch_size=batch_size)
+        if to_update:
+            now = timezone.now()
+            for product in to_update:
+                product.last_update = now
+            Product.objects.bulk_update(
+                to_update, [*fields, 'last_update'], batch_size=batch_size)
+
+        affected_collections = {product.collection_id for product in to_create}
+        for product in to_update:
+            affected_collections |= {product.collection_id,
+                                     product._previous_collection_id}
+        Collection.objects.recount_products(affected_collections)
+        # bulk_create() leaves pk unset on databases that can't return it
+        index_products([p for p in to_create if p.pk] + to_update)
+
+        updated = Product.objects.filter(pk__in=[p.pk for p in to_update])
+        transaction.on_commit(lambda: invalidate_products(updated))
+        for id in affected_collections:
+            transaction.on_commit(lambda id=id: invalidate_collection(id))
+    return {'created': len(to_create), 'updated': len(to_update)}, None
@@ -0,0 +1,190 @@
+from hashlib import md5
+from time import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from rest_framework.response import Response
+from .conditional import not_modified, set_validators
+
+
+PRODUCTS_VERSION_KEY = 'products:version'
+ORDERS_VERSION_KEY = 'orders:version'
+
+
+def product_version_key(product_id):
+    return f'product:{product_id}:version'
+
+
+def collection_version_key(collection_id):
+    return f'collection:{collection_id}:version'
+
+
+def get_versions(keys):
+    versions = cache.get_many(keys)
+    missing = {key: 1 for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def changed_at_key(key):
+    return f'{key}:changed_at'
+
+
+def bump_versions(keys):
+    """
+    Moves the version counters once the current transaction commits. A bump
+    before the commit would let a concurrent read cache the old row under
+    the new version.
+    """
+    transaction.on_commit(lambda: apply_bump(keys))
+
+
+def apply_bump(keys):
+    for key in keys:
+        # add() is a no-op when the key exists, so incr() never misses
+        cache.add(key, 1, timeout=None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 2, timeout=None)
+    now = time()
+    cache.set_many({changed_at_key(key): now for key in keys}, timeout=None)
+
+
+def get_changed_at(keys):
+    """
+    Latest time any of the version keys was bumped. A key whose time was
+    lost, e.g. after a cache flush, counts as changed now, which can only
+    cause an unneeded 200, never a wrong 304.
+    """
+    times = cache.get_many([changed_at_key(key) for key in keys])
+    missing = {changed_at_key(key): time() for key in keys
+               if changed_at_key(key) not in times}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        times.update(missing)
+    return max(times.values())
+
+
+def version_validator(keys, *extra):
+    """(validator, Last-Modified timestamp) for responses built from keys."""
+    changed_at = get_changed_at(keys)
+    return repr([get_versions(keys), changed_at, *extra]), changed_at
+
+
+def invalidate_product(product_id, *collection_ids):
+    keys = [PRODUCTS_VERSION_KEY, product_version_key(product_id)]
+    keys += [collection_version_key(id) for id in set(collection_ids) if id]
+    bump_versions(keys)
+
+
+def invalidate_collection(collection_id):
+    bump_versions([PRODUCTS_VERSION_KEY,
+                   collection_version_key(collection_id)])
+
+
+def invalidate_orders():
+    bump_versions([ORDERS_VERSION_KEY])
+
+
+def invalidate_products(queryset):
+    """
+    Queryset.update() and bulk_create() skip model signals, so callers
+    doing bulk writes must invalidate the affected products explicitly.
+    """
+    keys = {PRODUCTS_VERSION_KEY}
+    for product_id, collection_id in queryset.values_list('id', 'collection_id'):
+        keys.add(product_version_key(product_id))
+        keys.add(collection_version_key(collection_id))
+    bump_versions(list(keys))
+
+
+class CachedProductResponseMixin:
+    """
+    Read-through cache and conditional GET for product list and detail
+    responses.
+
+    Cache keys contain the version counters of everything the response
+    depends on, so writes never delete entries - they just move the
+    version and let stale entries expire.
+
+    Each entry also stores the response's validator. On a miss the
+    validator comes from one query (the latest last_update), so a client
+    whose ETag or Last-Modified is still current gets a 304 without the
+    page being read or serialized.
+    """
+    cache_timeout = getattr(settings, 'PRODUCT_CACHE_TIMEOUT', 10 * 60)
+
+    def get_cache_version_keys(self):
+        if self.kwargs.get('pk') is not None:
+            return [product_version_key(self.kwargs['pk'])]
+        collection_id = self.request.query_params.get('collection_id')
+        if collection_id and collection_id.isdigit():
+            return [collection_version_key(collection_id)]
+        return [PRODUCTS_VERSION_KEY]
+
+    def get_cache_key(self):
+        versions = get_versions(self.get_cache_version_keys())
+        params = sorted(self.request.query_params.lists())
+        # The cached data holds absolute URLs (pagination links, images),
+        # so the scheme and host are part of the key
+        raw = f'{self.request.build_absolute_uri(self.request.path)}?{params}'
+        digest = md5(raw.encode()).hexdigest()
+        return f'products:response:v3:{digest}:' + '.'.join(map(str, versions))
+
+    def get_validator(self):
+        """Returns (validator, last_modified timestamp), or None for a 404."""
+        keys = self.get_cache_version_keys()
+        products = self.get_queryset().model.objects.all()
+        pk = self.kwargs.get('pk')
+        if pk is not None:
+            row = products.filter(pk=pk).values_list('last_update', 'collection_id').first()
+            if row is None:
+                return None
+            last_update, extra = row[0], row
+        else:
+            # Aggregated over the same scope as the version keys rather than
+            # the filtered page: coarser, so at worst an extra 200, but it
+            # never runs the filters twice. Deletes bump the version keys,
+            # so no row count is needed.
+            collection_id = self.request.query_params.get('collection_id')
+            if collection_id and collection_id.isdigit():
+                products = products.filter(collection_id=collection_id)
+            last_update = products.aggregate(last_update=Max('last_update'))['last_update']
+            extra = last_update
+        validator, changed_at = version_validator(keys, extra)
+        if last_update is not None:
+            changed_at = max(changed_at, last_update.timestamp())
+        return validator, changed_at
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        pk = self.kwargs.get('pk')
+        if pk is not None and not str(pk).isdigit():
+            return handler(request, *args, **kwargs)
+
+        key = self.get_cache_key()
+        entry = cache.get(key)
+        validators = entry[1:] if entry is not None else self.get_validator()
+        if validators is not None:
+            response = not_modified(request, *validators)
+            if response is not None:
+                return set_validators(request, response, *validators)
+
+        if entry is not None:
+            response = Response(entry[0])
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code == 200 and validators is not None:
+                cache.set(key, (response.data, *validators), self.cache_timeout)
+        if validators is not None:
+            set_validators(request, response, *validators)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
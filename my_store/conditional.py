@@ -0,0 +1,70 @@
+"""
+Conditional GET (ETag / Last-Modified, 304 Not Modified) for product and
+collection reads.
+
+A validator is a string that changes whenever the response would. The
+ETag is a hash of it plus the renderer format, so the JSON and browsable
+API representations never share an ETag.
+"""
+from hashlib import md5
+from math import floor
+from time import time
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def make_etag(request, validator):
+    raw = f'{request.build_absolute_uri()}|{request.accepted_renderer.format}|{validator}'
+    return f'"{md5(raw.encode()).hexdigest()}"'
+
+
+def http_last_modified(changed_at):
+    """
+    Last-Modified has whole seconds, so a change is dated to the next
+    second. Until that second has passed, a later change could still get
+    the same date, so meanwhile only the ETag validates the response.
+    """
+    last_modified = floor(changed_at) + 1
+    return last_modified if last_modified <= time() else None
+
+
+def not_modified(request, validator, changed_at):
+    """Returns a 304 response if the client's copy is current, else None."""
+    return get_conditional_response(
+        request._request, etag=make_etag(request, validator),
+        last_modified=http_last_modified(changed_at))
+
+
+def set_validators(request, response, validator, changed_at):
+    if response.status_code in (200, 304):
+        response['ETag'] = make_etag(request, validator)
+        last_modified = http_last_modified(changed_at)
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    ETag and Last-Modified on list and retrieve, computed by
+    get_validator() before the handler runs so a 304 skips the queryset
+    and the serializer.
+    """
+
+    def get_validator(self):
+        """Returns (validator, last_modified timestamp), or None to skip."""
+        raise NotImplementedError
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        validators = self.get_validator()
+        if validators is None:
+            return handler(request, *args, **kwargs)
+        response = not_modified(request, *validators) or \
+            handler(request, *args, **kwargs)
+        return set_validators(request, response, *validators)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
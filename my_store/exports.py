@@ -0,0 +1,94 @@
+"""
+Streaming product export for ProductViewSet.export.
+
+Products are read in keyset batches of EXPORT_CHUNK_SIZE (WHERE id > last
+id ORDER BY id LIMIT n) and written out as each batch arrives, so memory
+stays flat however big the catalog is. Keyset batches are used instead of
+QuerySet.iterator() because the MySQL backend buffers the whole result set
+on the client even with iterator().
+"""
+import csv
+import json
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+CSV_COLUMNS = [
+    'id', 'title', 'slug', 'description', 'inventory', 'unit_price',
+    'price_with_tax', 'last_update', 'collection_id', 'collection_title',
+    'images', 'promotions',
+]
+
+
+def iterate_in_batches(queryset, chunk_size):
+    queryset = queryset.select_related('collection') \
+        .prefetch_related('images', 'promotions').order_by('id')
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        yield from batch
+        if len(batch) < chunk_size:
+            return
+        last_id = batch[-1].id
+
+
+def product_record(product, request):
+    return {
+        'id': product.id,
+        'title': product.title,
+        'slug': product.slug,
+        'description': product.description,
+        'inventory': product.inventory,
+        'unit_price': product.unit_price,
+        'price_with_tax': product.price_with_tax,
+        'last_update': product.last_update,
+        'collection': {'id': product.collection_id,
+                       'title': product.collection.title},
+        'images': [request.build_absolute_uri(image.image.url)
+                   for image in product.images.all()],
+        'promotions': [{'id': promotion.id,
+                        'description': promotion.description,
+                        'discount': promotion.discount}
+                       for promotion in product.promotions.all()],
+    }
+
+
+def ndjson_lines(records):
+    for record in records:
+        yield json.dumps(record, cls=DjangoJSONEncoder) + '\n'
+
+
+class Echo:
+    """File-like object whose write() returns the line instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(records):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for record in records:
+        yield writer.writerow([
+            record['id'], record['title'], record['slug'],
+            record['description'], record['inventory'], record['unit_price'],
+            record['price_with_tax'], record['last_update'].isoformat(),
+            record['collection']['id'], record['collection']['title'],
+            ' '.join(record['images']),
+            '; '.join(promotion['description']
+                      for promotion in record['promotions']),
+        ])
+
+
+FORMATS = {
+    'ndjson': (ndjson_lines, 'application/x-ndjson'),
+    'csv': (csv_lines, 'text/csv'),
+}
+
+
+def export_products(queryset, request, output):
+    """Returns (line iterator, content type) for one of FORMATS."""
+    lines, content_type = FORMATS[output]
+    chunk_size = settings.EXPORT_CHUNK_SIZE
+    records = (product_record(product, request)
+               for product in iterate_in_batches(queryset, chunk_size))
+    return lines(records), content_type
@@ -0,0 +1,207 @@
+"""
+Read-only serializers for hot GET endpoints.
+
+They read rows with values() and build the same dicts as the ModelSerializers
+in serializers.py, without creating model instances or dispatching through
+every serializer field. Nested rows are fetched with one query per page.
+Any change to the fields of ProductSerializer, OrderSerializer or
+CartSerializer has to be mirrored here; test_fast_serializers.py
+compares the rendered JSON of both paths.
+"""
+from collections import defaultdict
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+from likes.models import LikeCount
+from tags.models import TaggedItem
+from .models import CartItem, OrderItem, Product, ProductImage
+
+
+# DRF fields reused for their exact quantizing and formatting rules
+price = serializers.DecimalField(max_digits=6, decimal_places=2)
+line_total = serializers.DecimalField(max_digits=11, decimal_places=2)
+cart_total = serializers.DecimalField(max_digits=12, decimal_places=2)
+placed_at = serializers.DateTimeField()
+
+
+def group_by(rows, key):
+    groups = defaultdict(list)
+    for row in rows:
+        groups[row.pop(key)].append(row)
+    return groups
+
+
+class FastProductSerializer:
+    # last_update is only read by cursor pagination
+    fields = ['id', 'title', 'description', 'slug', 'inventory',
+              'unit_price', 'price_with_tax', 'collection_id', 'last_update']
+
+    def __init__(self, context):
+        self.request = context.get('request')
+        self.storage = ProductImage._meta.get_field('image').storage
+
+    def get_rows(self, queryset):
+        return queryset.prefetch_related(None).values(*self.fields)
+
+    def image_url(self, name):
+        if not name:
+            return None
+        url = self.storage.url(name)
+        if self.request is not None:
+            return self.request.build_absolute_uri(url)
+        return url
+
+    def image(self, image):
+        return {
+            'id': image['id'],
+            'image': self.image_url(image['image']),
+            'width': image['width'],
+            'height': image['height'],
+            'renditions': {name: {
+                'url': self.image_url(rendition['image']),
+                'width': rendition['width'],
+                'height': rendition['height'],
+            } for name, rendition in image['renditions'].items()},
+        }
+
+    def images_queryset(self, rows):
+        return ProductImage.objects \
+            .filter(product_id__in=[row['id'] for row in rows]) \
+            .values('id', 'product_id', 'image', 'width', 'height', 'renditions')
+
+    def to_representation(self, rows):
+        ids = [row['id'] for row in rows]
+        return self.build(rows, list(self.images_queryset(rows)),
+                          TaggedItem.objects.get_tags_for_many(Product, ids),
+                          LikeCount.objects.get_counts(Product, ids))
+
+    async def ato_representation(self, rows):
+        ids = [row['id'] for row in rows]
+        return self.build(rows, [image async for image in self.images_queryset(rows)],
+                          await TaggedItem.objects.aget_tags_for_many(Product, ids),
+                          await LikeCount.objects.aget_counts(Product, ids))
+
+    def build(self, rows, images, tags, likes):
+        images = group_by(images, 'product_id')
+        return [{
+            'id': row['id'],
+            'title': row['title'],
+            'description': row['description'],
+            'slug': row['slug'],
+            'inventory': row['inventory'],
+            'unit_price': price.to_representation(row['unit_price']),
+            'price_with_tax': row['price_with_tax'],
+            'collection': row['collection_id'],
+            'images': [self.image(image) for image in images[row['id']]],
+            'tags': tags[row['id']],
+            'likes': likes[row['id']],
+        } for row in rows]
+
+
+class FastOrderSerializer:
+    fields = ['id', 'placed_at', 'customer_id', 'payment_status']
+
+    def __init__(self, context):
+        pass
+
+    def get_rows(self, queryset):
+        return queryset.prefetch_related(None).values(*self.fields)
+
+    def to_representation(self, rows):
+        items = group_by(OrderItem.objects
+                         .filter(order_id__in=[row['id'] for row in rows])
+                         .values('id', 'order_id', 'unit_price', 'quantity', 'product_id',
+                                 'product__title', 'product__unit_price'), 'order_id')
+        return [{
+            'id': row['id'],
+            'placed_at': placed_at.to_representation(row['placed_at']),
+            'customer': row['customer_id'],
+            'payment_status': row['payment_status'],
+            'items': [{
+                'id': item['id'],
+                'unit_price': price.to_representation(item['unit_price']),
+                'quantity': item['quantity'],
+                'product': {
+                    'id': item['product_id'],
+                    'title': item['product__title'],
+                    'unit_price': price.to_representation(item['product__unit_price']),
+                },
+            } for item in items[row['id']]],
+        } for row in rows]
+
+
+class FastCartSerializer:
+    # Annotated by Cart.objects.with_totals()
+    row_fields = ['id', 'total_price', 'items_count']
+
+    def __init__(self, context):
+        pass
+
+    def get_row(self, queryset, pk):
+        return get_object_or_404(
+            queryset.prefetch_related(None).values(*self.row_fields), pk=pk)
+
+    def items_queryset(self, row):
+        return CartItem.objects.with_total_price().filter(cart_id=row['id']).values(
+            'id', 'quantity', 'product_id', 'product__title', 'product__unit_price',
+            'total_price')
+
+    def to_representation(self, row):
+        return self.build(row, list(self.items_queryset(row)))
+
+    async def ato_representation(self, row):
+        return self.build(row, [item async for item in self.items_queryset(row)])
+
+    def build(self, row, cart_items):
+        return {
+            'id': str(row['id']),
+            'items': [{
+                'id': item['id'],
+                'product': {
+                    'id': item['product_id'],
+                    'title': item['product__title'],
+                    'unit_price': price.to_representation(item['product__unit_price']),
+                },
+                'quantity': item['quantity'],
+                'total_price': line_total.to_representation(item['total_price']),
+            } for item in cart_items],
+            'total_price': cart_total.to_representation(row['total_price']),
+            'items_count': row['items_count'],
+        }
+
+
+class FastListMixin:
+    """
+    Serves GET list requests through fast_serializer_class when
+    settings.FAST_READ_SERIALIZERS is on.
+    """
+    fast_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        if not getattr(settings, 'FAST_READ_SERIALIZERS', False):
+            return super().list(request, *args, **kwargs)
+
+        fast_serializer = self.fast_serializer_class(self.get_serializer_context())
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = fast_serializer.get_rows(queryset)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(fast_serializer.to_representation(page))
+        return Response(fast_serializer.to_representation(list(rows)))
+
+
+class FastRetrieveMixin:
+    """
+    Serves GET detail requests through fast_serializer_class when
+    settings.FAST_READ_SERIALIZERS is on.
+    """
+    fast_serializer_class = None
+
+    def retrieve(self, request, *args, **kwargs):
+        if not getattr(settings, 'FAST_READ_SERIALIZERS', False):
+            return super().retrieve(request, *args, **kwargs)
+
+        fast_serializer = self.fast_serializer_class(self.get_serializer_context())
+        row = fast_serializer.get_row(self.get_queryset(), self.kwargs['pk'])
+        return Response(fast_serializer.to_representation(row))
@@ -0,0 +1,50 @@
+"""
+Resized WebP renditions of product images, generated in the background by
+tasks.generate_image_renditions after an upload.
+"""
+import posixpath
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image
+
+
+def rendition_name(name, rendition):
+    stem = posixpath.splitext(posixpath.basename(name))[0]
+    return posixpath.join(posixpath.dirname(name), 'renditions',
+                          f'{stem}_{rendition}.webp')
+
+
+def make_renditions(product_image):
+    """
+    Writes one WebP file per settings.PRODUCT_IMAGE_RENDITIONS entry, scaled
+    to fit its (width, height) box, and sets the width, height and
+    renditions of product_image. The caller saves it.
+    """
+    storage = product_image.image.storage
+    with product_image.image.open('rb') as file, Image.open(file) as original:
+        original.load()
+    product_image.width, product_image.height = original.size
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA')
+
+    renditions = {}
+    for rendition, size in settings.PRODUCT_IMAGE_RENDITIONS.items():
+        image = original.copy()
+        image.thumbnail(size)
+        buffer = BytesIO()
+        image.save(buffer, 'WEBP', quality=settings.PRODUCT_IMAGE_WEBP_QUALITY)
+
+        name = rendition_name(product_image.image.name, rendition)
+        if storage.exists(name):
+            storage.delete(name)
+        name = storage.save(name, ContentFile(buffer.getvalue()))
+        renditions[rendition] = {
+            'image': name, 'width': image.width, 'height': image.height}
+    product_image.renditions = renditions
+
+
+def delete_renditions(product_image):
+    storage = product_image.image.storage
+    for rendition in product_image.renditions.values():
+        storage.delete(rendition['image'])
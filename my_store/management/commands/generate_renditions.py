@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from my_store.models import ProductImage
+from my_store.tasks import generate_image_renditions
+
+
+class Command(BaseCommand):
+    help = 'Queues rendition jobs for product images that have none, or for every image with --all.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Regenerate renditions for every image, e.g. after changing PRODUCT_IMAGE_RENDITIONS.')
+
+    def handle(self, *args, **options):
+        images = ProductImage.objects.order_by('id')
+        if not options['all']:
+            images = images.filter(renditions={})
+        queued = 0
+        for image_id in images.values_list('id', flat=True).iterator():
+            generate_image_renditions.delay(image_id)
+            queued += 1
+        self.stdout.write(self.style.SUCCESS(f'Queued {queued} images.'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from my_store.models import Collection
+
+
+class Command(BaseCommand):
+    help = 'Recomputes Collection.products_count, or only reports drift with --check.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Report collections whose count is wrong without fixing them.')
+
+    def handle(self, *args, **options):
+        drifted = [
+            (collection.id, collection.products_count, collection.actual_count)
+            for collection in Collection.objects
+            .annotate(actual_count=Count('products')).order_by('id')
+            if collection.products_count != collection.actual_count
+        ]
+        for id, stored, actual in drifted:
+            self.stdout.write(
+                f'Collection {id}: products_count is {stored}, actual {actual}')
+
+        if options['check']:
+            if drifted:
+                raise CommandError(f'{len(drifted)} collections have a wrong products_count.')
+            self.stdout.write(self.style.SUCCESS('All products counts are correct.'))
+            return
+
+        Collection.objects.recount_products([id for id, _, _ in drifted])
+        self.stdout.write(self.style.SUCCESS(
+            f'Fixed {len(drifted)} collections.'))
@@ -0,0 +1,49 @@
+from django.db import migrations
+
+
+MYSQL_FORWARD = [
+    "ALTER TABLE my_store_product "
+    "ADD FULLTEXT INDEX my_store_product_search (title, description)",
+]
+MYSQL_BACKWARD = [
+    "ALTER TABLE my_store_product DROP INDEX my_store_product_search",
+]
+
+# MySQL maintains FULLTEXT indexes itself; on SQLite the FTS5 table is kept
+# up to date by my_store.search.index_products.
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE my_store_product_fts USING fts5(title, description)",
+    "INSERT INTO my_store_product_fts(rowid, title, description) "
+    "SELECT id, title, description FROM my_store_product",
+]
+SQLITE_BACKWARD = [
+    "DROP TABLE my_store_product_fts",
+]
+
+STATEMENTS = {
+    'mysql': (MYSQL_FORWARD, MYSQL_BACKWARD),
+    'sqlite': (SQLITE_FORWARD, SQLITE_BACKWARD),
+}
+
+
+def create_search_index(apps, schema_editor):
+    forward, _ = STATEMENTS.get(schema_editor.connection.vendor, ([], []))
+    for statement in forward:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    _, backward = STATEMENTS.get(schema_editor.connection.vendor, ([], []))
+    for statement in backward:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("my_store", "0009_alter_orderitem_order_productimage"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:28
+
+import django.core.validators
+import my_store.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("my_store", "0010_product_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="collection",
+            name="tax_rate",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=3,
+                max_digits=4,
+                null=True,
+                validators=[
+                    django.core.validators.MinValueValidator(0),
+                    django.core.validators.MaxValueValidator(1),
+                ],
+            ),
+        ),
+        migrations.AlterField(
+            model_name="productimage",
+            name="image",
+            field=models.ImageField(
+                upload_to="my_store/images",
+                validators=[my_store.validators.validate_file_size],
+            ),
+        ),
+    ]
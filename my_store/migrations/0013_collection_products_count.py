@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:40
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_products(apps, schema_editor):
+    Collection = apps.get_model("my_store", "Collection")
+    Product = apps.get_model("my_store", "Product")
+    count = (
+        Product.objects.filter(collection=OuterRef("pk"))
+        .order_by()
+        .values("collection")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    Collection.objects.update(products_count=Coalesce(Subquery(count), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("my_store", "0012_orderevent"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="collection",
+            name="products_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_products, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:41
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def compute_order_stats(apps, schema_editor):
+    Customer = apps.get_model("my_store", "Customer")
+    Order = apps.get_model("my_store", "Order")
+    OrderItem = apps.get_model("my_store", "OrderItem")
+    orders = (
+        Order.objects.filter(customer=OuterRef("pk"))
+        .order_by()
+        .values("customer")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    spent = (
+        OrderItem.objects.filter(
+            order__customer=OuterRef("pk"), order__payment_status="C"
+        )
+        .order_by()
+        .values("order__customer")
+        .annotate(total=Sum(F("quantity") * F("unit_price")))
+        .values("total")
+    )
+    Customer.objects.update(
+        orders_count=Coalesce(Subquery(orders), 0),
+        total_spent=Coalesce(
+            Subquery(spent), Decimal(0), output_field=models.DecimalField()
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("my_store", "0013_collection_products_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customer",
+            name="orders_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="customer",
+            name="total_spent",
+            field=models.DecimalField(
+                decimal_places=2, default=0, editable=False, max_digits=12
+            ),
+        ),
+        migrations.RunPython(compute_order_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("my_store", "0014_customer_order_stats"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["customer", "placed_at"], name="my_store_or_custome_b9ec06_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["collection", "unit_price"],
+                name="my_store_pr_collect_39e192_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["title"], name="my_store_pr_title_7e369b_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["unit_price"], name="my_store_pr_unit_pr_e1c125_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["last_update"], name="my_store_pr_last_up_b9e68c_idx"
+            ),
+        ),
+    ]
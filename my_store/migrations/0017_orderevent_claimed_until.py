@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("my_store", "0016_product_image_renditions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="orderevent",
+            name="claimed_until",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
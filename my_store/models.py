@@ -1,9 +1,14 @@
 from wsgiref.validate import validator
-from django.core.validators import MinValueValidator
-from django.db import models
+from decimal import ROUND_HALF_UP, Decimal
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import (Case, Count, DecimalField, ExpressionWrapper, F, OuterRef,
+                              Subquery, Sum, Value, When)
+from django.db.models.functions import Coalesce, Round
 from django.contrib import admin
 from uuid import uuid4
 from django.conf import settings
+from .caching import PRODUCTS_VERSION_KEY, bump_versions, collection_version_key
 from .validators import validate_file_size
 from my_store import permissions
 
@@ -13,11 +18,38 @@ class Promotion(models.Model):
     discount = models.FloatField()
 
 
+class CollectionManager(models.Manager):
+    def recount_products(self, ids=None):
+        """
+        Recomputes products_count in one UPDATE. Needed after writes that
+        skip Product.save()/delete(), such as bulk_create() or update().
+        """
+        count = Product.objects.filter(collection=OuterRef('pk')) \
+            .order_by().values('collection').annotate(count=Count('id')).values('count')
+        collections = self.all() if ids is None else self.filter(pk__in=ids)
+        updated = collections.update(
+            products_count=Coalesce(Subquery(count), 0))
+        # update() skips the signals that would move the cache versions
+        if ids is None:
+            ids = collections.values_list('pk', flat=True)
+        bump_versions([PRODUCTS_VERSION_KEY,
+                       *(collection_version_key(id) for id in ids if id is not None)])
+        return updated
+
+
 class Collection(models.Model):
+    objects = CollectionManager()
     title = models.CharField(max_length=255)
     featured_product = models.ForeignKey(
         "Product", on_delete=models.SET_NULL, null=True, related_name="+", blank=True
     )
+    # Overrides settings.DEFAULT_TAX_RATE for products in this collection
+    tax_rate = models.DecimalField(
+        max_digits=4, decimal_places=3, null=True, blank=True,
+        validators=[MinValueValidator(0), MaxValueValidator(1)]
+    )
+    # Maintained by Product.save() and the product post_delete signal
+    products_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self) -> str:
         return self.title
@@ -26,7 +58,37 @@ class Collection(models.Model):
         ordering = ["title"]
 
 
+class ProductManager(models.Manager):
+    def with_price_with_tax(self):
+        tax_rate = Coalesce(
+            F('collection__tax_rate'), Value(Decimal(settings.DEFAULT_TAX_RATE)),
+            output_field=DecimalField(max_digits=4, decimal_places=3))
+        return self.get_queryset().annotate(price_with_tax=ExpressionWrapper(
+            Round(F('unit_price') * (1 + tax_rate), 2),
+            output_field=DecimalField(max_digits=8, decimal_places=2)))
+
+    def reserve_inventory(self, quantities):
+        """
+        Takes {product_id: quantity} out of stock with one conditional UPDATE.
+        Either every product is decremented or none is; returns the ids of
+        the products that did not have enough inventory.
+        """
+        if not quantities:
+            return []
+        quantity = Case(*[When(pk=id, then=Value(q)) for id, q in quantities.items()])
+        with transaction.atomic():
+            reserved = self.filter(pk__in=quantities, inventory__gte=quantity) \
+                .update(inventory=F('inventory') - quantity)
+            if reserved == len(quantities):
+                return []
+            transaction.set_rollback(True)
+        return [id for id, inventory in
+                self.filter(pk__in=quantities).values_list('id', 'inventory')
+                if inventory < quantities[id]]
+
+
 class Product(models.Model):
+    objects = ProductManager()
     title = models.CharField(max_length=255)
     slug = models.SlugField()
     description = models.TextField(null=True, blank=True)
@@ -43,8 +105,40 @@ class Product(models.Model):
     def __str__(self) -> str:
         return self.title
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            self._previous_collection_id = None
+            if self.pk:
+                # Locked so concurrent moves see each other's collection
+                self._previous_collection_id = Product.objects.select_for_update() \
+                    .filter(pk=self.pk).values_list('collection_id', flat=True).first()
+            super().save(*args, **kwargs)
+            if self._previous_collection_id != self.collection_id:
+                if self._previous_collection_id is not None:
+                    Collection.objects.filter(pk=self._previous_collection_id) \
+                        .update(products_count=F('products_count') - 1)
+                Collection.objects.filter(pk=self.collection_id) \
+                    .update(products_count=F('products_count') + 1)
+
+    def calculate_price_with_tax(self):
+        tax_rate = self.collection.tax_rate
+        if tax_rate is None:
+            tax_rate = Decimal(settings.DEFAULT_TAX_RATE)
+        # Half up, like the SQL ROUND() in ProductManager.with_price_with_tax
+        return (self.unit_price * (1 + tax_rate)).quantize(
+            Decimal('0.01'), rounding=ROUND_HALF_UP)
+
     class Meta:
         ordering = ["title"]
+        indexes = [
+            # ProductFilter: collection_id exact + unit_price range
+            models.Index(fields=['collection', 'unit_price']),
+            # Default and ?ordering= fields; the primary key rides along as
+            # the cursor pagination tiebreaker
+            models.Index(fields=['title']),
+            models.Index(fields=['unit_price']),
+            models.Index(fields=['last_update']),
+        ]
 
 
 class ProductImage(models.Model):
@@ -52,9 +146,34 @@ class ProductImage(models.Model):
         Product, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(
         upload_to='my_store/images', validators=[validate_file_size])
+    # Filled in by tasks.generate_image_renditions after the upload
+    width = models.PositiveIntegerField(null=True, editable=False)
+    height = models.PositiveIntegerField(null=True, editable=False)
+    renditions = models.JSONField(default=dict, editable=False)
+
+
+class CustomerManager(models.Manager):
+    def recompute_order_stats(self, ids=None):
+        """
+        Recomputes orders_count and total_spent in one UPDATE. Needed after
+        order writes that skip Order.save(), such as queryset update().
+        """
+        orders = Order.objects.filter(customer=OuterRef('pk')).order_by() \
+            .values('customer').annotate(count=Count('id')).values('count')
+        spent = OrderItem.objects.filter(
+            order__customer=OuterRef('pk'),
+            order__payment_status=Order.PAYMENT_STATUS_COMPLETE).order_by() \
+            .values('order__customer') \
+            .annotate(total=Sum(F('quantity') * F('unit_price'))).values('total')
+        customers = self.all() if ids is None else self.filter(pk__in=ids)
+        return customers.update(
+            orders_count=Coalesce(Subquery(orders), 0),
+            total_spent=Coalesce(Subquery(spent), Decimal(0),
+                                 output_field=models.DecimalField()))
 
 
 class Customer(models.Model):
+    objects = CustomerManager()
     MEMBERSHIP_BRONZE = "B"
     MEMBERSHIP_SILVER = "S"
     MEMBERSHIP_GOLD = "G"
@@ -72,6 +191,11 @@ class Customer(models.Model):
     )
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # Maintained by Order.save() and the order signal handlers;
+    # total_spent only counts complete orders
+    orders_count = models.PositiveIntegerField(default=0, editable=False)
+    total_spent = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0, editable=False)
 
     @admin.display(ordering='user__first_name')
     def first_name(self):
@@ -105,10 +229,61 @@ class Order(models.Model):
     )
     customer = models.ForeignKey(Customer, on_delete=models.PROTECT)
 
+    def save(self, *args, **kwargs):
+        # No savepoint: a failed stats update has to roll back the order too
+        with transaction.atomic(savepoint=False):
+            previous_status = None
+            if self.pk:
+                # Locked so concurrent status changes count the total once
+                previous_status = Order.objects.select_for_update().filter(pk=self.pk) \
+                    .values_list('payment_status', flat=True).first()
+            super().save(*args, **kwargs)
+
+            changes = {}
+            if previous_status is None:
+                changes['orders_count'] = F('orders_count') + 1
+            was_complete = previous_status == self.PAYMENT_STATUS_COMPLETE
+            is_complete = self.payment_status == self.PAYMENT_STATUS_COMPLETE
+            # A new order has no items yet; they count as they are added
+            if previous_status is not None and was_complete != is_complete:
+                total = self.calculate_total()
+                changes['total_spent'] = F('total_spent') + \
+                    (total if is_complete else -total)
+            if changes:
+                Customer.objects.filter(pk=self.customer_id).update(**changes)
+
+    def calculate_total(self):
+        return self.items.aggregate(
+            total=Sum(F('quantity') * F('unit_price')))['total'] or Decimal(0)
+
     class Meta:
         permissions = [
             ('cancel_order', 'Can cancel order')
         ]
+        indexes = [models.Index(fields=['customer', 'placed_at'])]
+
+
+class OrderEvent(models.Model):
+    """
+    Outbox row written in the same transaction as the order it describes.
+    my_store.tasks.dispatch_order_events delivers it after commit.
+    """
+    EVENT_CREATED = "created"
+    EVENT_CHOICES = [
+        (EVENT_CREATED, "Created"),
+    ]
+
+    order = models.ForeignKey(
+        Order, on_delete=models.CASCADE, related_name='events')
+    event = models.CharField(max_length=20, choices=EVENT_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+    # Set while a dispatch_order_events run is delivering the event
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['dispatched_at', 'id'])]
 
 
 class OrderItem(models.Model):
@@ -125,12 +300,85 @@ class Address(models.Model):
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
 
 
+class CartManager(models.Manager):
+    def with_totals(self):
+        """
+        Annotates total_price and items_count (the sum of the quantities)
+        with one subquery each, so totals need no cart item or product rows.
+        """
+        items = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+        total = items.annotate(total=Sum(F('quantity') * F('product__unit_price'))) \
+            .values('total')
+        count = items.annotate(count=Sum('quantity')).values('count')
+        return self.get_queryset().annotate(
+            total_price=Coalesce(
+                Subquery(total), Value(Decimal(0)),
+                output_field=DecimalField(max_digits=12, decimal_places=2)),
+            items_count=Coalesce(Subquery(count), 0))
+
+
 class Cart(models.Model):
+    objects = CartManager()
     id = models.UUIDField(primary_key=True, default=uuid4)
     created_at = models.DateTimeField(auto_now_add=True)
 
 
+class CartItemManager(models.Manager):
+    def with_total_price(self):
+        return self.get_queryset().annotate(total_price=ExpressionWrapper(
+            F('quantity') * F('product__unit_price'),
+            output_field=DecimalField(max_digits=11, decimal_places=2)))
+
+    # Formatted with the quoted table and column names. The MySQL row
+    # alias needs 8.0.19+; VALUES() in the update clause is deprecated.
+    UPSERT_SQL = {
+        'mysql': (
+            'INSERT INTO {table} ({cart}, {product}, {quantity}) '
+            'VALUES (%s, %s, %s) AS new '
+            'ON DUPLICATE KEY UPDATE {quantity} = {table}.{quantity} + new.{quantity}'
+        ),
+        'sqlite': (
+            'INSERT INTO {table} ({cart}, {product}, {quantity}) '
+            'VALUES (%s, %s, %s) '
+            'ON CONFLICT ({cart}, {product}) '
+            'DO UPDATE SET {quantity} = {table}.{quantity} + excluded.{quantity}'
+        ),
+    }
+    UPSERT_SQL['postgresql'] = UPSERT_SQL['sqlite']
+
+    def add_quantity(self, cart_id, product_id, quantity):
+        """
+        Adds quantity to the cart item, creating it if needed, in a single
+        statement relying on the (cart, product) unique constraint.
+        """
+        sql = self.UPSERT_SQL.get(connection.vendor)
+        if sql is not None:
+            opts = self.model._meta
+            quote_name = connection.ops.quote_name
+            sql = sql.format(table=quote_name(opts.db_table), **{
+                name: quote_name(opts.get_field(name).column)
+                for name in ('cart', 'product', 'quantity')})
+            # Cart ids are stored the way the backend stores UUIDs
+            cart_id = opts.get_field('cart').get_db_prep_value(
+                cart_id, connection)
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [cart_id, product_id, quantity])
+            return
+
+        items = self.filter(cart_id=cart_id, product_id=product_id)
+        if items.update(quantity=F('quantity') + quantity):
+            return
+        try:
+            with transaction.atomic():
+                self.create(cart_id=cart_id, product_id=product_id,
+                            quantity=quantity)
+        except IntegrityError:
+            # Another request created the item after our update
+            items.update(quantity=F('quantity') + quantity)
+
+
 class CartItem(models.Model):
+    objects = CartItemManager()
     cart = models.ForeignKey(
         Cart, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
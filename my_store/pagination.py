@@ -0,0 +1,302 @@
+import json
+from base64 import b64decode, b64encode
+from hashlib import md5
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.core.paginator import InvalidPage, Paginator as DjangoPaginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from .caching import get_versions
+
+
+def table_row_estimate(model, using):
+    """Row count from the database's statistics, or None if it has none."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT table_rows FROM information_schema.tables '
+                'WHERE table_schema = DATABASE() AND table_name = %s', [table])
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'sqlite':
+            # sqlite_stat1 only exists once ANALYZE has run
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            # Every row of a table starts with the table's row count
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    # PostgreSQL reports -1 for tables that were never analyzed
+    return estimate if estimate >= 0 else None
+
+
+class CountedPaginator(DjangoPaginator):
+    """Django's paginator with the count supplied instead of queried."""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.supplied_count = count
+
+    @cached_property
+    def count(self):
+        return self.supplied_count
+
+
+class LookaheadPage:
+    """
+    A page read with one extra row, which tells whether there is a next
+    page without knowing the count.
+    """
+
+    def __init__(self, rows, number, page_size):
+        self.object_list = rows[:page_size]
+        self.number = number
+        self.next_exists = len(rows) > page_size
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_exists
+
+    def has_previous(self):
+        return self.number > 1
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page number pagination by default, keyset pagination with
+    ?pagination=cursor.
+
+    In cursor mode the page is selected with a WHERE on the ordering field
+    plus an id tiebreaker, so there is no COUNT(*) and no OFFSET scan.
+
+    In page number mode the count is, in order of preference:
+
+    - left out of the response with ?count=false
+    - cached, for views that set count_version_keys, until one of those
+      version counters moves
+    - the database's row estimate, for unfiltered lists of tables above
+      PAGINATION_ESTIMATE_THRESHOLD rows
+    - COUNT(*)
+
+    Pages without an exact count are read with one extra row to find out
+    whether there is a next page.
+    """
+    mode_query_param = 'pagination'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = request.query_params.get(
+            self.mode_query_param) == 'cursor'
+        if not self.use_cursor:
+            return self.paginate_by_page_number(queryset, request, view)
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.field, self.descending = self.get_ordering(request, queryset, view)
+        page_size = self.get_page_size(request)
+
+        value, id, reverse = self.decode_cursor(request, queryset.model)
+        # Walking backwards runs the same query with the ordering flipped
+        descending = self.descending != reverse
+        queryset = queryset.order_by(*self.order_by(descending))
+        if id is not None:
+            queryset = queryset.filter(self.after(value, id, descending))
+
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+
+        self.has_next = has_more if not reverse else id is not None
+        self.has_previous = has_more if reverse else id is not None
+        self.page = results
+        return results
+
+    def paginate_by_page_number(self, queryset, request, view):
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        self.count, exact = self.get_count(queryset, request, view)
+        if not exact:
+            return self.paginate_with_lookahead(queryset, request, page_size)
+
+        paginator = CountedPaginator(queryset, page_size, self.count)
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)))
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return list(self.page)
+
+    def paginate_with_lookahead(self, queryset, request, page_size):
+        page_number = request.query_params.get(self.page_query_param) or '1'
+        if not page_number.isdigit() or int(page_number) < 1:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message='Invalid page.'))
+        number = int(page_number)
+
+        start = (number - 1) * page_size
+        rows = list(queryset[start:start + page_size + 1])
+        if not rows and number > 1:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message='That page contains no results'))
+        self.page = LookaheadPage(rows, number, page_size)
+        return list(self.page)
+
+    def get_count(self, queryset, request, view):
+        """Returns (count or None, whether it is exact)."""
+        if request.query_params.get(self.count_query_param) == 'false':
+            return None, False
+
+        queryset = queryset.order_by()
+        keys = getattr(view, 'count_version_keys', None)
+        key = self.get_count_cache_key(queryset, keys) if keys else None
+        if key is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+
+        counted = self.count_rows(queryset)
+        if key is not None:
+            cache.set(key, counted, settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+        return counted
+
+    def count_rows(self, queryset):
+        query = queryset.query
+        # Only an unfiltered list has as many rows as its table
+        if not query.where and not query.distinct and not query.combinator:
+            # Statistics are approximate anyway, so they are re-read at most
+            # once per timeout
+            estimate = cache.get_or_set(
+                f'pagination:estimate:{queryset.db}:{queryset.model._meta.db_table}',
+                lambda: table_row_estimate(queryset.model, queryset.db),
+                settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+            if estimate is not None and \
+                    estimate >= settings.PAGINATION_ESTIMATE_THRESHOLD:
+                return estimate, False
+        return queryset.count(), True
+
+    def get_count_cache_key(self, queryset, keys):
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return None
+        digest = md5(f'{sql}|{params}'.encode()).hexdigest()
+        return f'pagination:count:{digest}:' + '.'.join(map(str, get_versions(keys)))
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            response = {
+                'count': self.count,
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link(),
+                'results': data,
+            }
+            if self.count is None:
+                del response['count']
+            return Response(response)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.use_cursor:
+            return super().get_next_link()
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.use_cursor:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = request.query_params.get(api_settings.ORDERING_PARAM)
+        allowed = getattr(view, 'ordering_fields', None) or []
+        if ordering and ordering.lstrip('-') in allowed:
+            return ordering.lstrip('-'), ordering.startswith('-')
+
+        default = getattr(view, 'ordering', None) or \
+            queryset.model._meta.ordering or ['id']
+        field = default[0]
+        return field.lstrip('-'), field.startswith('-')
+
+    def order_by(self, descending):
+        prefix = '-' if descending else ''
+        if self.field == 'id':
+            return [prefix + 'id']
+        return [prefix + self.field, prefix + 'id']
+
+    def after(self, value, id, descending):
+        lookup = 'lt' if descending else 'gt'
+        if self.field == 'id':
+            return Q(**{f'id__{lookup}': id})
+        return Q(**{f'{self.field}__{lookup}': value}) | \
+            Q(**{self.field: value, f'id__{lookup}': id})
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, None, False
+        try:
+            position = json.loads(b64decode(encoded.encode('ascii')))
+            # A tampered value would otherwise fail inside the filter
+            value = model._meta.get_field(self.field).to_python(position['v'])
+            return value, int(position['id']), bool(position['r'])
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, item, reverse):
+        # values() querysets paginate into dicts
+        if isinstance(item, dict):
+            value, id = item[self.field], item['id']
+        else:
+            value, id = getattr(item, self.field), item.id
+        position = {
+            'v': value if isinstance(value, (int, str)) else str(value),
+            'id': id,
+            'r': reverse,
+        }
+        encoded = b64encode(json.dumps(position).encode()).decode('ascii')
+        url = remove_query_param(self.base_url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
@@ -0,0 +1,86 @@
+import re
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+
+FTS_TABLE = 'my_store_product_fts'
+
+# innodb_ft_min_token_size: shorter words are not in the MySQL index
+MYSQL_MIN_WORD_LENGTH = 3
+MYSQL_RANK = (
+    'MATCH (my_store_product.title, my_store_product.description) '
+    'AGAINST (%s IN BOOLEAN MODE)'
+)
+SQLITE_MATCHES = f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+SQLITE_RANK = (
+    f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+    f'WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = my_store_product.id'
+)
+
+
+def tokenize(terms):
+    return [word for term in terms for word in re.findall(r'\w+', term)]
+
+
+def contains_words(queryset, words):
+    for word in words:
+        queryset = queryset.filter(
+            Q(title__icontains=word) | Q(description__icontains=word))
+    return queryset
+
+
+def search_products(queryset, words):
+    """
+    Filters queryset to products matching every word, prefix-matched, and
+    ranks them by relevance through the full-text index built by migration
+    0010. Databases without one, and words too short for MySQL's index,
+    fall back to icontains.
+    """
+    if connection.vendor == 'mysql':
+        queryset = contains_words(
+            queryset, [word for word in words if len(word) < MYSQL_MIN_WORD_LENGTH])
+        words = [word for word in words if len(word) >= MYSQL_MIN_WORD_LENGTH]
+        if not words:
+            return queryset
+        query = ' '.join(f'+{word}*' for word in words)
+        queryset = queryset.annotate(
+            search_rank=RawSQL(MYSQL_RANK, [query])).filter(search_rank__gt=0)
+    elif connection.vendor == 'sqlite':
+        query = ' '.join(f'"{word}"*' for word in words)
+        queryset = queryset.filter(id__in=RawSQL(SQLITE_MATCHES, [query])) \
+            .annotate(search_rank=RawSQL(SQLITE_RANK, [query]))
+    else:
+        return contains_words(queryset, words)
+
+    return queryset.order_by('-search_rank', 'id')
+
+
+class ProductSearchFilter(SearchFilter):
+    """SearchFilter through search_products(); see there for the matching rules."""
+
+    def filter_queryset(self, request, queryset, view):
+        words = tokenize(self.get_search_terms(request))
+        if not words:
+            return queryset
+        return search_products(queryset, words)
+
+
+def index_products(products):
+    if connection.vendor != 'sqlite' or not products:
+        return
+    ids = [(product.id,) for product in products]
+    rows = [(product.id, product.title, product.description)
+            for product in products]
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', ids)
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, description) VALUES (%s, %s, %s)', rows)
+
+
+def unindex_product(product_id):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product_id])
@@ -1,8 +1,12 @@
 from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
 from decimal import Decimal
-from .models import Customer, Order, OrderItem, Product, Collection, ProductImage, Review, Cart, CartItem
-from .signals import order_created
+from .caching import invalidate_products
+from .models import Customer, Order, OrderEvent, OrderItem, Product, Collection, ProductImage, Review, Cart, CartItem
+from .tasks import dispatch_order_events
+from likes.models import LikeCount
+from tags.models import TaggedItem
 
 """
 class CollectionSerializer(serializers.Serializer):
@@ -45,20 +49,48 @@ class ProductSerializer(serializers.Serializer):
 
 
 class ProductImageSerializer(serializers.ModelSerializer):
+    renditions = serializers.SerializerMethodField()
+
     class Meta:
         model = ProductImage
-        fields = ['id', 'image']
+        fields = ['id', 'image', 'width', 'height', 'renditions']
+
+    # Empty until tasks.generate_image_renditions has run
+    def get_renditions(self, product_image: ProductImage):
+        storage = product_image.image.storage
+        request = self.context.get('request')
+        renditions = {}
+        for name, rendition in product_image.renditions.items():
+            url = storage.url(rendition['image'])
+            renditions[name] = {
+                'url': request.build_absolute_uri(url) if request else url,
+                'width': rendition['width'],
+                'height': rendition['height'],
+            }
+        return renditions
 
     def create(self, validated_data):
         product_id = self.context["product_id"]
         return ProductImage.objects.create(product_id=product_id, **validated_data)
 
 
+class ProductListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        products = list(data.all() if hasattr(data, 'all') else data)
+        # One query each for the tags and like counts of the whole page
+        TaggedItem.objects.prefetch_tags(products)
+        LikeCount.objects.prefetch_counts(products)
+        return super().to_representation(products)
+
+
 class ProductSerializer(serializers.ModelSerializer):
     images = ProductImageSerializer(many=True, read_only=True)
+    tags = serializers.SerializerMethodField()
+    likes = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
+        list_serializer_class = ProductListSerializer
         fields = [
             "id",
             "title",
@@ -68,7 +100,9 @@ class ProductSerializer(serializers.ModelSerializer):
             "unit_price",
             "price_with_tax",
             "collection",
-            "images"
+            "images",
+            "tags",
+            "likes",
         ]
 
     # Can override defualt collection representation by below code
@@ -80,8 +114,33 @@ class ProductSerializer(serializers.ModelSerializer):
     price_with_tax = serializers.SerializerMethodField(
         method_name="calculate_tax")
 
+    # Querysets from Product.objects.with_price_with_tax() carry the value
+    # computed by the database; only freshly saved products get here without it
     def calculate_tax(self, product: Product):
-        return product.unit_price * Decimal(1.1)
+        if hasattr(product, 'price_with_tax'):
+            return product.price_with_tax
+        return product.calculate_price_with_tax()
+
+    def get_tags(self, product: Product):
+        TaggedItem.objects.prefetch_tags([product])
+        return product.tag_labels
+
+    def get_likes(self, product: Product):
+        LikeCount.objects.prefetch_counts([product])
+        return product.likes_count
+
+    def create(self, validated_data):
+        product = super().create(validated_data)
+        # Nothing can be tagged or liked before it exists
+        product.tag_labels = []
+        product.likes_count = 0
+        return product
+
+    def update(self, instance, validated_data):
+        instance = super().update(instance, validated_data)
+        # The annotated value was computed from the old price
+        vars(instance).pop('price_with_tax', None)
+        return instance
 
 
 class SimpleProductSerializer(serializers.ModelSerializer):
@@ -114,10 +173,8 @@ class CartItemProductSerializer(serializers.ModelSerializer):
 
 class CartItemSerializer(serializers.ModelSerializer):
     product = CartItemProductSerializer()
-    total_price = serializers.SerializerMethodField()
-
-    def get_total_price(self, cart_item: CartItem):
-        return cart_item.quantity * cart_item.product.unit_price
+    # Annotated by CartItem.objects.with_total_price()
+    total_price = serializers.DecimalField(max_digits=11, decimal_places=2, read_only=True)
 
     class Meta:
         model = CartItem
@@ -129,15 +186,20 @@ class CartItemSerializer(serializers.ModelSerializer):
 class CartSerializer(serializers.ModelSerializer):
     id = serializers.UUIDField(read_only=True)
     items = CartItemSerializer(many=True, read_only=True)
-    total_price = serializers.SerializerMethodField()
+    # Annotated by Cart.objects.with_totals()
+    total_price = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    items_count = serializers.IntegerField(read_only=True)
 
-    def get_total_price(self, cart):
-        return sum([item.quantity * item.product.unit_price for item in cart.items.all()])
+    def create(self, validated_data):
+        cart = super().create(validated_data)
+        # A new cart is empty, so there is nothing to annotate
+        cart.total_price, cart.items_count = Decimal(0), 0
+        return cart
 
     class Meta:
         model = Cart
         fields = [
-            'id', 'items', 'total_price'
+            'id', 'items', 'total_price', 'items_count'
         ]
 
 
@@ -145,7 +207,7 @@ class AddCartItemSerializer(serializers.ModelSerializer):
     product_id = serializers.IntegerField()
 
     def validate_product_id(self, value):
-        if not Product.objects.filter(pk=value):
+        if not Product.objects.filter(pk=value).exists():
             raise serializers.ValidationError("No Product with this id")
         return value
 
@@ -153,15 +215,9 @@ class AddCartItemSerializer(serializers.ModelSerializer):
         cart_id = self.context['cart_id']
         product_id = self.validated_data['product_id']
         quantity = self.validated_data['quantity']
-        try:
-            cart_item = CartItem.objects.get(
-                cart_id=cart_id, product_id=product_id)
-            cart_item.quantity += quantity
-            cart_item.save()
-            self.instance = cart_item
-        except CartItem.DoesNotExist:
-            self.instance = CartItem.objects.create(
-                cart_id=cart_id, **self.validated_data)
+        CartItem.objects.add_quantity(cart_id, product_id, quantity)
+        self.instance = CartItem.objects.get(
+            cart_id=cart_id, product_id=product_id)
         return self.instance
 
     class Meta:
@@ -180,7 +236,8 @@ class CustomerSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Customer
-        fields = ['id', 'user_id', 'phone', 'birth_date', 'membership']
+        fields = ['id', 'user_id', 'phone', 'birth_date', 'membership',
+                  'orders_count', 'total_spent']
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -197,6 +254,10 @@ class OrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = ['id', 'placed_at', 'customer', 'payment_status', 'items']
+        # Applied by OrderViewSet.get_queryset, one query per nested level
+        prefetch_plan = [
+            Prefetch('items', queryset=OrderItem.objects.select_related('product'))
+        ]
 
 
 class UpdateOrderSerializer(serializers.ModelSerializer):
@@ -209,22 +270,41 @@ class CreateOrderSerializer(serializers.Serializer):
     cart_id = serializers.UUIDField()
 
     def validate_cart_id(self, cart_id):
+        # Loaded once and reused by save() to build the order items
+        self.cart_items = list(CartItem.objects.select_related(
+            'product').filter(cart_id=cart_id))
+        if self.cart_items:
+            return cart_id
         if not Cart.objects.filter(pk=cart_id).exists():
             raise serializers.ValidationError("No cart with given id")
-        if CartItem.objects.filter(cart_id=cart_id).count() == 0:
-            raise serializers.ValidationError("Cart is empty")
-        return cart_id
+        raise serializers.ValidationError("Cart is empty")
 
     def save(self, **kwargs):
         with transaction.atomic():
             cart_id = self.validated_data['cart_id']
             user_id = self.context['user_id']
 
-            customer = Customer.objects.get(
+            # The cart was read during validation; deleting it first makes a
+            # concurrent checkout of the same cart wait here, then fail
+            if Cart.objects.filter(pk=cart_id).delete()[0] == 0:
+                raise serializers.ValidationError(
+                    {'cart_id': ["No cart with given id"]})
+
+            customer = Customer.objects.only('id').get(
                 user_id=user_id)
             order = Order.objects.create(customer=customer)
-            cart_items = CartItem.objects.select_related(
-                'product').filter(cart_id=cart_id)
+            cart_items = self.cart_items
+
+            quantities = {item.product_id: item.quantity for item in cart_items}
+            out_of_stock = Product.objects.reserve_inventory(quantities)
+            if out_of_stock:
+                titles = sorted(item.product.title for item in cart_items
+                                if item.product_id in out_of_stock)
+                raise serializers.ValidationError(
+                    {'cart_id': [f"Not enough inventory for: {', '.join(titles)}"]})
+            transaction.on_commit(lambda: invalidate_products(
+                Product.objects.filter(pk__in=quantities)))
+
             order_items = [
                 OrderItem(
                     order=order,
@@ -234,7 +314,24 @@ class CreateOrderSerializer(serializers.Serializer):
                 ) for item in cart_items
             ]
             OrderItem.objects.bulk_create(order_items)
-            Cart.objects.filter(pk=cart_id).delete()
 
-            order_created.send_robust(self.__class__, order=order)
+            self.order_items = order_items
+
+            OrderEvent.objects.create(
+                order=order, event=OrderEvent.EVENT_CREATED)
+            # The order is committed by then; if the broker is down the
+            # beat sweep delivers the event instead of checkout failing
+            transaction.on_commit(dispatch_order_events.delay, robust=True)
+            self.instance = order
             return order
+
+    def to_representation(self, order):
+        """The created order as OrderSerializer returns it."""
+        # Backends that return ids from bulk_create let the items save()
+        # built (and their products) be serialized without querying again
+        if not all(item.pk for item in self.order_items):
+            prefetch_related_objects([order], *OrderSerializer.Meta.prefetch_plan)
+            return OrderSerializer(order, context=self.context).data
+        serializer = OrderSerializer(order, context=self.context)
+        items = serializer.fields.pop('items')
+        return {**serializer.data, 'items': items.to_representation(self.order_items)}
@@ -1,7 +1,16 @@
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.conf import settings
-from ..models import Customer
+from django.contrib.contenttypes.models import ContentType
+from likes.signals import like_counts_flushed
+from tags.models import Tag, TaggedItem
+from ..caching import invalidate_collection, invalidate_orders, invalidate_product, invalidate_products
+from ..images import delete_renditions
+from ..models import Collection, Customer, Order, OrderItem, Product, ProductImage
+from ..search import index_products, unindex_product
+from ..tasks import generate_image_renditions
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
@@ -10,3 +19,144 @@ def create_customer_for_new_user(sender, **kwargs):
         Customer.objects.create(user=kwargs['instance'])
 
 
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    invalidate_product(instance.pk, instance.collection_id,
+                       getattr(instance, '_previous_collection_id', None))
+
+
+# Cached order list counts, see KeysetPagination
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def invalidate_order_counts(sender, instance, **kwargs):
+    invalidate_orders()
+
+
+# Order.save() keeps the customer's stats current for order saves; these
+# cover deletes and item writes, e.g. items added to an order created as
+# complete. Items are protected, so they are deleted before their order.
+# Items written with bulk_create() or update() need recompute_order_stats().
+@receiver(post_delete, sender=Order)
+def decrement_orders_count(sender, instance, **kwargs):
+    Customer.objects.filter(pk=instance.customer_id) \
+        .update(orders_count=F('orders_count') - 1)
+
+
+def change_total_spent(item, sign):
+    Customer.objects.filter(
+        order__pk=item.order_id,
+        order__payment_status=Order.PAYMENT_STATUS_COMPLETE,
+    ).update(total_spent=F('total_spent') + sign * item.quantity * item.unit_price)
+
+
+@receiver(post_save, sender=OrderItem)
+def count_item_in_total_spent(sender, instance, created, **kwargs):
+    if created:
+        change_total_spent(instance, 1)
+        return
+    # The previous quantity and price are gone, so count the order again
+    customer_id = Order.objects.filter(
+        pk=instance.order_id, payment_status=Order.PAYMENT_STATUS_COMPLETE,
+    ).values_list('customer_id', flat=True).first()
+    if customer_id is not None:
+        Customer.objects.recompute_order_stats([customer_id])
+
+
+@receiver(post_delete, sender=OrderItem)
+def deduct_item_from_total_spent(sender, instance, **kwargs):
+    change_total_spent(instance, -1)
+
+
+@receiver(post_save, sender=Product)
+def index_product_for_search(sender, instance, **kwargs):
+    index_products([instance])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product_for_search(sender, instance, **kwargs):
+    unindex_product(instance.pk)
+
+
+# Sent inside the deletion's transaction, for queryset deletes as well
+@receiver(post_delete, sender=Product)
+def decrement_products_count(sender, instance, **kwargs):
+    Collection.objects.filter(pk=instance.collection_id) \
+        .update(products_count=F('products_count') - 1)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def invalidate_product_image_cache(sender, instance, **kwargs):
+    collection_id = Product.objects.filter(
+        pk=instance.product_id).values_list('collection_id', flat=True).first()
+    invalidate_product(instance.product_id, collection_id)
+
+
+# Replacing the file outdates its size and renditions; the post_save
+# below queues new ones
+@receiver(pre_save, sender=ProductImage)
+def reset_replaced_image_renditions(sender, instance, update_fields=None, **kwargs):
+    if instance.pk is None or (update_fields and 'image' not in update_fields):
+        return
+    previous = ProductImage.objects.filter(pk=instance.pk) \
+        .only('image', 'renditions').first()
+    if previous is None or previous.image.name == instance.image.name:
+        return
+    instance.width = instance.height = None
+    instance.renditions = {}
+    transaction.on_commit(lambda: delete_renditions(previous))
+
+
+@receiver(post_save, sender=ProductImage)
+def enqueue_image_renditions(sender, instance, update_fields=None, **kwargs):
+    # The task saves its results with update_fields, which must not loop
+    if update_fields and 'renditions' in update_fields:
+        return
+    # The upload is committed by then; if the broker is down the image
+    # keeps no renditions until manage.py generate_renditions runs
+    transaction.on_commit(lambda: generate_image_renditions.delay(instance.pk), robust=True)
+
+
+@receiver(post_delete, sender=ProductImage)
+def delete_image_renditions(sender, instance, **kwargs):
+    transaction.on_commit(lambda: delete_renditions(instance))
+
+
+@receiver(post_save, sender=Collection)
+@receiver(post_delete, sender=Collection)
+def invalidate_collection_cache(sender, instance, **kwargs):
+    invalidate_collection(instance.pk)
+
+
+# Product details are cached per product, and their price_with_tax
+# follows the collection's tax rate
+@receiver(post_save, sender=Collection)
+def invalidate_collection_products_cache(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_products(Product.objects.filter(collection_id=instance.pk))
+
+
+@receiver(post_save, sender=TaggedItem)
+@receiver(post_delete, sender=TaggedItem)
+def invalidate_tagged_product_cache(sender, instance, **kwargs):
+    # get_for_model() is cached, so untagged models cost no query
+    if instance.content_type_id != ContentType.objects.get_for_model(Product).id:
+        return
+    collection_id = Product.objects.filter(
+        pk=instance.object_id).values_list('collection_id', flat=True).first()
+    invalidate_product(instance.object_id, collection_id)
+
+
+@receiver(post_save, sender=Tag)
+def invalidate_relabeled_products_cache(sender, instance, created, **kwargs):
+    if created:
+        return
+    invalidate_products(Product.objects.filter(id__in=TaggedItem.objects.filter(
+        tag=instance, content_type=ContentType.objects.get_for_model(Product),
+    ).values('object_id')))
+
+
+@receiver(like_counts_flushed, sender=Product)
+def invalidate_liked_products_cache(sender, object_ids, **kwargs):
+    invalidate_products(Product.objects.filter(id__in=object_ids))
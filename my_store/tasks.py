@@ -0,0 +1,82 @@
+import logging
+from datetime import timedelta
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, prefetch_related_objects
+from django.utils import timezone
+from PIL import UnidentifiedImageError
+from .images import make_renditions
+from .models import Order, OrderEvent, ProductImage
+from .signals import order_created
+
+logger = logging.getLogger(__name__)
+
+EVENT_SIGNALS = {
+    OrderEvent.EVENT_CREATED: order_created,
+}
+
+
+@shared_task(bind=True, max_retries=5)
+def dispatch_order_events(self):
+    """
+    Sends the signal for a batch of pending outbox events. Delivery is at
+    least once: when a receiver fails, the whole event is retried later.
+
+    The batch is claimed for ORDER_EVENTS_CLAIM_TIMEOUT seconds in a short
+    transaction, and the receivers run after it commits, so no row stays
+    locked while mail is sent. If a worker dies mid-batch, its claim runs
+    out and the next run picks the events up.
+    """
+    batch_size = settings.ORDER_EVENTS_BATCH_SIZE
+    now = timezone.now()
+    with transaction.atomic():
+        # skip_locked lets concurrent workers claim different batches
+        events = list(OrderEvent.objects
+                      .select_for_update(skip_locked=True)
+                      .filter(Q(claimed_until__isnull=True) | Q(claimed_until__lt=now),
+                              dispatched_at__isnull=True,
+                              attempts__lt=settings.ORDER_EVENTS_MAX_ATTEMPTS)
+                      .order_by('id')[:batch_size])
+        OrderEvent.objects.filter(pk__in=[event.id for event in events]).update(
+            claimed_until=now + timedelta(seconds=settings.ORDER_EVENTS_CLAIM_TIMEOUT))
+
+    failed = False
+    prefetch_related_objects(events, 'order')
+    for event in events:
+        responses = EVENT_SIGNALS[event.event].send_robust(
+            Order, order=event.order)
+        errors = [response for _, response in responses
+                  if isinstance(response, Exception)]
+        for error in errors:
+            logger.error('Order event %s failed: %r', event.id, error)
+        if errors:
+            event.attempts += 1
+            failed = True
+        else:
+            event.dispatched_at = timezone.now()
+        event.claimed_until = None
+    OrderEvent.objects.bulk_update(
+        events, ['dispatched_at', 'attempts', 'claimed_until'])
+
+    if failed:
+        raise self.retry(countdown=2 ** self.request.retries)
+    if len(events) == batch_size:
+        dispatch_order_events.delay()
+    return len(events)
+
+
+@shared_task(bind=True, max_retries=3)
+def generate_image_renditions(self, image_id):
+    product_image = ProductImage.objects.filter(pk=image_id).first()
+    if product_image is None:
+        return None
+    try:
+        make_renditions(product_image)
+    except UnidentifiedImageError:
+        logger.error('Product image %s is not a readable image', image_id)
+        return None
+    except OSError as exc:
+        raise self.retry(exc=exc, countdown=30)
+    product_image.save(update_fields=['width', 'height', 'renditions'])
+    return list(product_image.renditions)
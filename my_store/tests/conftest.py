@@ -1,11 +1,80 @@
+import re
+from collections import Counter
 from rest_framework.test import APIClient
 import pytest
 from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Maximum number of queries per router endpoint and method. Every request
+# made through api_client to a my_store view is checked against this table.
+QUERY_BUDGETS = {
+    # GET includes the conditional GET validator query, see test_conditional.py
+    "products-list": {"GET": 7, "POST": 8},
+    "products-detail": {"GET": 5, "PATCH": 12},
+    "products-like": {"POST": 6, "DELETE": 3},
+    # Streamed: the batch queries run while the body is read, see
+    # test_product_export.py
+    "products-export": {"GET": 1},
+    "products-bulk": {"POST": 9},
+    "collection-list": {"GET": 2, "POST": 1},
+    "collection-detail": {"GET": 1, "PATCH": 3},
+    "product-reviews-list": {"GET": 2, "POST": 1},
+    "product-reviews-detail": {"GET": 1, "DELETE": 2},
+    "product-image-list": {"GET": 2, "POST": 2},
+    "product-image-detail": {"GET": 1, "PATCH": 4, "DELETE": 3},
+    "cart-list": {"POST": 3},
+    "cart-detail": {"GET": 2, "DELETE": 5},
+    "cart-items-list": {"GET": 2, "POST": 3},
+    "cart-items-detail": {"GET": 1, "PATCH": 2, "DELETE": 2},
+    # POST deletes the cart before reserving stock, so a 400 for short
+    # stock also pays for the rolled back cart delete
+    "orders-list": {"GET": 4, "POST": 15},
+    "orders-detail": {"GET": 2, "PATCH": 5},
+    "customer-detail": {"GET": 1, "PUT": 2},
+    "customer-me": {"GET": 1},
+}
+
+
+class QueryBudgetAPIClient(APIClient):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.query_budgets = {name: dict(budget)
+                              for name, budget in QUERY_BUDGETS.items()}
+
+    def request(self, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            response = super().request(**kwargs)
+        self.check_query_budget(response, queries.captured_queries)
+        return response
+
+    def check_query_budget(self, response, queries):
+        match = response.resolver_match
+        view_class = getattr(match and match.func, 'cls', None)
+        if view_class is None or view_class.__module__ != 'my_store.views':
+            return
+
+        method = response.request['REQUEST_METHOD']
+        budget = self.query_budgets.get(match.url_name, {}).get(method)
+        if budget is None:
+            pytest.fail(f'No query budget for {method} {match.url_name}')
+        if len(queries) > budget:
+            # Queries that differ only in parameters are the N+1 suspects
+            shapes = Counter(re.sub(r"'[^']*'|\b\d+\b", '?', q['sql'])
+                             for q in queries)
+            duplicates = [f'  {count}x {sql}'
+                          for sql, count in shapes.items() if count > 1]
+            pytest.fail('\n'.join([
+                f'{method} {match.url_name} ran {len(queries)} queries, '
+                f'budget is {budget}.',
+                'Duplicated SQL:' if duplicates else 'No duplicated SQL.',
+                *duplicates,
+            ]))
 
 
 @pytest.fixture
 def api_client():
-    return APIClient()
+    return QueryBudgetAPIClient()
 
 
 @pytest.fixture
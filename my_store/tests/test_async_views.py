@@ -0,0 +1,83 @@
+from django.core.cache import cache
+import pytest
+from model_bakery import baker
+from my_store.models import Cart, CartItem, Collection, Product, ProductImage, Review
+
+
+@pytest.fixture
+def get_both(api_client):
+    def do_get_both(url):
+        cache.clear()
+        sync = api_client.get(f'/store/{url}').content
+        # Pagination links point back at the async routes
+        async_ = api_client.get(f'/store/async/{url}').content \
+            .replace(b'/store/async/', b'/store/')
+        return sync, async_
+    return do_get_both
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAsyncViews:
+    def test_if_products_are_listed_json_matches_sync_view(self, get_both):
+        collection = baker.make(Collection)
+        products = baker.make(Product, unit_price='2.5', collection=collection, _quantity=12)
+        baker.make(ProductImage, product=products[0], image='my_store/images/a.jpg')
+
+        for url in ['products/', 'products/?page=2',
+                    f'products/?collection_id={collection.id}&ordering=-unit_price']:
+            sync, async_ = get_both(url)
+            assert async_ == sync
+
+    def test_if_products_are_searched_json_matches_sync_view(self, get_both):
+        baker.make(Product, unit_price=3, title='Mechanical keyboard')
+        baker.make(Product, unit_price=3, title='Mouse', description='Pairs with any keyboard')
+        baker.make(Product, unit_price=3, title='Monitor')
+
+        sync, async_ = get_both('products/?search=keyb')
+
+        assert async_ == sync
+        assert b'Monitor' not in async_
+
+    def test_if_price_filter_is_not_finite_returns_400(self, api_client):
+        for value in ['nan', 'inf']:
+            res = api_client.get(f'/store/async/products/?unit_price__gt={value}')
+
+            assert res.status_code == 400
+            assert api_client.get(f'/store/products/?unit_price__gt={value}').status_code == 400
+
+    def test_if_product_is_retrieved_json_matches_sync_view(self, get_both):
+        product = baker.make(Product, unit_price=3)
+
+        sync, async_ = get_both(f'products/{product.id}/')
+
+        assert async_ == sync
+
+    def test_if_collections_are_listed_json_matches_sync_view(self, get_both):
+        collection = baker.make(Collection)
+        baker.make(Product, unit_price=3, collection=collection, _quantity=2)
+
+        assert get_both('collections/')[1] == get_both('collections/')[0]
+        sync, async_ = get_both(f'collections/{collection.id}/')
+        assert async_ == sync
+
+    def test_if_reviews_are_listed_json_matches_sync_view(self, get_both):
+        product = baker.make(Product, unit_price=3)
+        baker.make(Review, product=product, _quantity=3)
+
+        sync, async_ = get_both(f'products/{product.id}/reviews/')
+
+        assert async_ == sync
+
+    def test_if_cart_is_retrieved_json_matches_sync_view(self, get_both):
+        cart = baker.make(Cart)
+        baker.make(CartItem, cart=cart, product__unit_price=4, quantity=2)
+
+        sync, async_ = get_both(f'carts/{cart.id}/')
+
+        assert async_ == sync
+
+    def test_if_product_does_not_exist_returns_404(self, api_client):
+        assert api_client.get('/store/async/products/999/').status_code == 404
+
+    def test_if_method_is_not_get_returns_405(self, api_client):
+        assert api_client.post('/store/async/products/').status_code == 405
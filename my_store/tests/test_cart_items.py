@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from django.db import connection
+import pytest
+from model_bakery import baker
+from my_store.models import Cart, CartItem, Product
+
+
+@pytest.fixture
+def add_item(api_client):
+    def do_add_item(cart, product, quantity):
+        return api_client.post(f'/store/carts/{cart.id}/items/',
+                               {'product_id': product.id, 'quantity': quantity})
+    return do_add_item
+
+
+@pytest.mark.django_db
+class TestAddCartItem:
+    def test_if_product_is_new_item_is_created(self, add_item):
+        cart = baker.make(Cart)
+        product = baker.make(Product, unit_price=1)
+
+        res = add_item(cart, product, 2)
+
+        assert res.status_code == 201
+        assert res.data['quantity'] == 2
+        assert res.data['id'] == CartItem.objects.get().id
+
+    def test_if_product_is_in_cart_quantity_is_incremented(self, add_item):
+        cart = baker.make(Cart)
+        product = baker.make(Product, unit_price=1)
+
+        add_item(cart, product, 2)
+        res = add_item(cart, product, 3)
+
+        assert res.data['quantity'] == 5
+        assert CartItem.objects.count() == 1
+
+    def test_if_vendor_has_no_upsert_fallback_increments(self, monkeypatch):
+        monkeypatch.setattr(CartItem.objects, 'UPSERT_SQL', {})
+        cart = baker.make(Cart)
+        product = baker.make(Product, unit_price=1)
+
+        CartItem.objects.add_quantity(cart.id, product.id, 2)
+        CartItem.objects.add_quantity(cart.id, product.id, 3)
+
+        assert CartItem.objects.get().quantity == 5
+
+
+@pytest.mark.django_db
+class TestCartTotals:
+    def test_if_cart_is_retrieved_returns_totals(self, api_client):
+        cart = baker.make(Cart)
+        baker.make(CartItem, cart=cart, quantity=3, product__unit_price='2.50')
+        baker.make(CartItem, cart=cart, quantity=1, product__unit_price='4.00')
+
+        res = api_client.get(f'/store/carts/{cart.id}/')
+
+        assert [item['total_price'] for item in res.data['items']] == \
+            [Decimal('7.50'), Decimal('4.00')]
+        assert res.data['total_price'] == Decimal('11.50')
+        assert res.data['items_count'] == 4
+
+    def test_if_cart_grows_query_count_is_constant(self, api_client, django_assert_num_queries):
+        cart = baker.make(Cart)
+        baker.make(CartItem, cart=cart, quantity=1, product__unit_price=1, _quantity=20)
+
+        # cart with its totals, items joined with their products
+        with django_assert_num_queries(2):
+            res = api_client.get(f'/store/carts/{cart.id}/')
+
+        assert res.data['total_price'] == 20
+
+    def test_if_cart_is_created_returns_zero_totals(self, api_client):
+        res = api_client.post('/store/carts/')
+
+        assert res.data['total_price'] == 0
+        assert res.data['items_count'] == 0
+
+    def test_if_items_are_listed_returns_line_totals(self, api_client):
+        cart = baker.make(Cart)
+        baker.make(CartItem, cart=cart, quantity=2, product__unit_price='3.25')
+
+        res = api_client.get(f'/store/carts/{cart.id}/items/')
+
+        assert res.data['results'][0]['total_price'] == Decimal('6.50')
+
+
+@pytest.mark.django_db(transaction=True)
+def test_if_items_are_added_concurrently_no_update_is_lost():
+    cart = baker.make(Cart)
+    product = baker.make(Product, unit_price=1)
+
+    def add_one(_):
+        try:
+            CartItem.objects.add_quantity(cart.id, product.id, 1)
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(add_one, range(40)))
+
+    assert CartItem.objects.get().quantity == 40
@@ -1,4 +1,7 @@
 from gc import collect
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from rest_framework import status
 import pytest
 from model_bakery import baker
@@ -53,4 +56,52 @@ class TestRetrieveCollection:
 
         assert res.status_code == status.HTTP_200_OK
         assert res.data == {'id': collection.id, 'title': collection.title,
-                            'products_counts': 0}
+                            'products_count': 0}
+
+
+@pytest.mark.django_db
+class TestProductsCount:
+    def test_if_products_are_created_and_deleted_count_follows(self):
+        collection = baker.make(Collection)
+        products = baker.make(Product, collection=collection, unit_price=1, _quantity=3)
+
+        products[0].delete()
+        Product.objects.filter(pk=products[1].pk).delete()
+
+        collection.refresh_from_db()
+        assert collection.products_count == 1
+
+    def test_if_product_moves_both_counts_change(self):
+        old, new = baker.make(Collection, _quantity=2)
+        product = baker.make(Product, collection=old, unit_price=1)
+
+        product.collection = new
+        product.save()
+
+        old.refresh_from_db()
+        new.refresh_from_db()
+        assert (old.products_count, new.products_count) == (0, 1)
+
+    def test_if_collections_are_listed_no_aggregate_is_run(self, api_client, django_assert_num_queries):
+        baker.make(Product, unit_price=1, _quantity=3)
+
+        with django_assert_num_queries(2):
+            res = api_client.get('/store/collections/')
+
+        assert [c['products_count'] for c in res.data['results']] == [1, 1, 1]
+
+
+@pytest.mark.django_db
+class TestRecountProductsCommand:
+    def test_if_counts_drifted_check_fails_and_recount_fixes(self):
+        collection = baker.make(Collection)
+        baker.make(Product, collection=collection, unit_price=1, _quantity=2)
+        Collection.objects.update(products_count=7)
+
+        with pytest.raises(CommandError):
+            call_command('recount_products', '--check', stdout=StringIO())
+        call_command('recount_products', stdout=StringIO())
+
+        collection.refresh_from_db()
+        assert collection.products_count == 2
+        call_command('recount_products', '--check', stdout=StringIO())
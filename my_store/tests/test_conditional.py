@@ -0,0 +1,139 @@
+from time import time
+from rest_framework import status
+import pytest
+from model_bakery import baker
+from my_store.caching import CachedProductResponseMixin
+from my_store.models import Collection, Product
+
+
+@pytest.fixture
+def seconds_later(monkeypatch):
+    now = time()
+    monkeypatch.setattr('my_store.conditional.time', lambda: now + 5)
+
+
+@pytest.mark.django_db
+class TestProductConditionalGet:
+    def test_if_product_is_retrieved_returns_etag_and_last_modified(self, api_client, seconds_later):
+        product = baker.make(Product, unit_price=10)
+
+        res = api_client.get(f'/store/products/{product.id}/')
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res['ETag'].startswith('"')
+        assert res['Last-Modified']
+
+    def test_if_product_changed_this_second_returns_no_last_modified(self, api_client):
+        product = baker.make(Product, unit_price=10)
+
+        res = api_client.get(f'/store/products/{product.id}/')
+
+        assert res['ETag'].startswith('"')
+        assert 'Last-Modified' not in res
+
+    def test_if_etag_matches_returns_304_with_one_query(
+            self, api_client, django_assert_num_queries, monkeypatch):
+        monkeypatch.setattr(CachedProductResponseMixin, 'cache_timeout', 0)
+        product = baker.make(Product, unit_price=10)
+        etag = api_client.get(f'/store/products/{product.id}/')['ETag']
+
+        with django_assert_num_queries(1):
+            res = api_client.get(f'/store/products/{product.id}/', HTTP_IF_NONE_MATCH=etag)
+
+        assert res.status_code == status.HTTP_304_NOT_MODIFIED
+        assert res['ETag'] == etag
+
+    def test_if_response_is_cached_and_etag_matches_returns_304_without_queries(
+            self, api_client, django_assert_num_queries):
+        baker.make(Product, unit_price=10, _quantity=3)
+        etag = api_client.get('/store/products/')['ETag']
+
+        with django_assert_num_queries(0):
+            res = api_client.get('/store/products/', HTTP_IF_NONE_MATCH=etag)
+
+        assert res.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_if_product_is_updated_returns_200_with_new_etag(
+            self, api_client, django_capture_on_commit_callbacks):
+        product = baker.make(Product, unit_price=10)
+        etag = api_client.get(f'/store/products/{product.id}/')['ETag']
+
+        product.title = 'changed'
+        with django_capture_on_commit_callbacks(execute=True):
+            product.save()
+        res = api_client.get(f'/store/products/{product.id}/', HTTP_IF_NONE_MATCH=etag)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res['ETag'] != etag
+        assert res.data['title'] == 'changed'
+
+    def test_if_product_is_added_list_returns_200(self, api_client, django_capture_on_commit_callbacks):
+        product = baker.make(Product, unit_price=10)
+        url = f'/store/products/?collection_id={product.collection_id}'
+        etag = api_client.get(url)['ETag']
+
+        with django_capture_on_commit_callbacks(execute=True):
+            baker.make(Product, collection=product.collection, unit_price=10)
+        res = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.data['count'] == 2
+
+    def test_if_query_differs_etag_differs(self, api_client):
+        baker.make(Product, unit_price=10)
+
+        first = api_client.get('/store/products/?page=1')['ETag']
+        second = api_client.get('/store/products/?ordering=unit_price')['ETag']
+
+        assert first != second
+
+    def test_if_modified_since_last_modified_returns_304(self, api_client, seconds_later):
+        product = baker.make(Product, unit_price=10)
+        last_modified = api_client.get(f'/store/products/{product.id}/')['Last-Modified']
+
+        res = api_client.get(f'/store/products/{product.id}/',
+                             HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        assert res.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_if_product_does_not_exist_returns_404_without_etag(self, api_client):
+        res = api_client.get('/store/products/0/')
+
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+        assert 'ETag' not in res
+
+
+@pytest.mark.django_db
+class TestCollectionConditionalGet:
+    def test_if_etag_matches_returns_304_without_queries(self, api_client, django_assert_num_queries):
+        collection = baker.make(Collection)
+        etag = api_client.get(f'/store/collections/{collection.id}/')['ETag']
+
+        with django_assert_num_queries(0):
+            res = api_client.get(f'/store/collections/{collection.id}/', HTTP_IF_NONE_MATCH=etag)
+
+        assert res.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_if_product_is_added_list_returns_200(self, api_client, django_capture_on_commit_callbacks):
+        collection = baker.make(Collection)
+        etag = api_client.get('/store/collections/')['ETag']
+
+        with django_capture_on_commit_callbacks(execute=True):
+            baker.make(Product, collection=collection, unit_price=10)
+        res = api_client.get('/store/collections/', HTTP_IF_NONE_MATCH=etag)
+
+        assert res.status_code == status.HTTP_200_OK
+
+    def test_if_products_are_recounted_list_returns_200(
+            self, api_client, django_capture_on_commit_callbacks):
+        collection = baker.make(Collection)
+        baker.make(Product, collection=collection, unit_price=10)
+        Collection.objects.filter(pk=collection.pk).update(products_count=0)
+        etag = api_client.get('/store/collections/')['ETag']
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Collection.objects.recount_products()
+        res = api_client.get('/store/collections/', HTTP_IF_NONE_MATCH=etag)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.data['results'][0]['products_count'] == 1
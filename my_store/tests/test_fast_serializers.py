@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+import pytest
+from model_bakery import baker
+from my_store.models import Cart, CartItem, Order, OrderItem, Product, ProductImage
+from tags.models import TaggedItem
+
+User = get_user_model()
+
+
+@pytest.fixture
+def get_both(api_client, settings):
+    def do_get_both(url):
+        responses = []
+        for fast in [False, True]:
+            settings.FAST_READ_SERIALIZERS = fast
+            cache.clear()
+            responses.append(api_client.get(url).content)
+        return responses
+    return do_get_both
+
+
+@pytest.mark.django_db
+class TestFastSerializers:
+    def test_if_products_are_listed_json_is_identical(self, get_both):
+        products = baker.make(Product, unit_price='9.5', _quantity=3)
+        baker.make(ProductImage, product=products[0],
+                   image='my_store/images/a.jpg', _quantity=2)
+        baker.make(ProductImage, product=products[2], image='my_store/images/b.jpg',
+                   width=640, height=480, renditions={'thumbnail': {
+                       'image': 'my_store/images/renditions/b_thumbnail.webp',
+                       'width': 100, 'height': 75}})
+        baker.make(TaggedItem, content_object=products[1], _quantity=2)
+
+        slow, fast = get_both('/store/products/?ordering=-unit_price')
+
+        assert fast == slow
+
+    def test_if_products_are_paged_by_cursor_json_is_identical(self, get_both):
+        baker.make(Product, unit_price='1.25', _quantity=12)
+
+        slow, fast = get_both('/store/products/?pagination=cursor&ordering=last_update')
+
+        assert fast == slow
+
+    def test_if_orders_are_listed_json_is_identical(self, authenticate, get_both):
+        authenticate(is_staff=True)
+        # Saving a user creates its customer through a signal
+        customer = baker.make(User).customer
+        for order in baker.make(Order, customer=customer, _quantity=3):
+            baker.make(OrderItem, order=order, unit_price='3.3',
+                       product__unit_price='4', _quantity=2)
+
+        slow, fast = get_both('/store/orders/')
+
+        assert fast == slow
+
+    def test_if_cart_is_retrieved_json_is_identical(self, get_both):
+        cart = baker.make(Cart)
+        baker.make(CartItem, cart=cart, quantity=3,
+                   product__unit_price='2.99', _quantity=2)
+
+        slow, fast = get_both(f'/store/carts/{cart.id}/')
+
+        assert fast == slow
+
+    def test_if_cart_is_empty_json_is_identical(self, get_both):
+        cart = baker.make(Cart)
+
+        slow, fast = get_both(f'/store/carts/{cart.id}/')
+
+        assert fast == slow
@@ -0,0 +1,100 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from rest_framework import status
+import pytest
+from model_bakery import baker
+from likes.models import LikedItem
+from my_store.models import Collection, Order, OrderItem, Product
+from tags.models import TaggedItem
+
+User = get_user_model()
+
+# Access paths that have to be served by an index
+PRODUCT_URLS = [
+    '/store/products/',
+    '/store/products/?collection_id={collection}&unit_price__gt=1&unit_price__lt=50',
+    '/store/products/?ordering=-unit_price',
+    '/store/products/?ordering=last_update',
+    '/store/products/?ordering=-last_update&pagination=cursor',
+    '/store/products/{product}/',
+]
+
+# Statistics lookups, e.g. for pagination row estimates
+CATALOG_TABLES = ('sqlite_master', 'sqlite_stat1', 'information_schema.', 'pg_class')
+
+
+def explain(sql, params):
+    """
+    Returns the full table scans in the plan of one query, as
+    human-readable lines.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            details = [row[-1] for row in cursor.fetchall()]
+            return [detail for detail in details
+                    if detail.startswith('SCAN ') and ' USING ' not in detail]
+        if connection.vendor == 'mysql':
+            cursor.execute('EXPLAIN ' + sql, params)
+            columns = [column[0] for column in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            return [f"full scan of {row['table']}" for row in rows
+                    if row['type'] == 'ALL']
+    pytest.skip(f'No EXPLAIN check for {connection.vendor}')
+
+
+@pytest.fixture
+def full_scans():
+    def do_full_scans(run):
+        queries = []
+
+        def capture(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('SELECT') and \
+                    not any(table in sql for table in CATALOG_TABLES):
+                queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(capture):
+            run()
+        assert queries
+        return [f'{scan}: {sql}' for sql, params in queries
+                for scan in explain(sql, params)]
+    return do_full_scans
+
+
+@pytest.mark.django_db
+class TestIndexes:
+    @pytest.mark.parametrize('url', PRODUCT_URLS)
+    def test_if_products_are_read_no_full_scan_is_planned(self, api_client, full_scans, url):
+        collection = baker.make(Collection)
+        product = baker.make(Product, collection=collection, unit_price=10,
+                             _quantity=3)[0]
+        url = url.format(collection=collection.id, product=product.id)
+
+        def get():
+            assert api_client.get(url).status_code == status.HTTP_200_OK
+
+        assert full_scans(get) == []
+
+    def test_if_customer_lists_orders_no_full_scan_is_planned(self, api_client, full_scans):
+        user = baker.make(User)
+        for order in baker.make(Order, customer=user.customer, _quantity=2):
+            baker.make(OrderItem, order=order)
+        api_client.force_authenticate(user=user)
+
+        def get():
+            assert api_client.get('/store/orders/').status_code == status.HTTP_200_OK
+
+        assert full_scans(get) == []
+
+    @pytest.mark.parametrize('model', [TaggedItem, LikedItem])
+    def test_if_generic_items_are_looked_up_no_full_scan_is_planned(self, full_scans, model):
+        product = baker.make(Product)
+        baker.make(model, content_object=product, _quantity=2)
+        content_type = baker.make(model, content_object=product).content_type
+
+        def lookup():
+            list(model.objects.filter(content_type=content_type,
+                                      object_id=product.id))
+
+        assert full_scans(lookup) == []
@@ -0,0 +1,130 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework import status
+import pytest
+from model_bakery import baker
+from likes import counters
+from likes.models import LikeCount, LikedItem
+from likes.tasks import flush_like_counts
+from my_store.models import Product
+
+User = get_user_model()
+
+
+@pytest.fixture
+def like(api_client):
+    def do_like(product, method='post', user=None):
+        api_client.force_authenticate(user=user or baker.make(User))
+        return getattr(api_client, method)(f'/store/products/{product.id}/like/')
+    return do_like
+
+
+@pytest.mark.django_db
+class TestLikeProduct:
+    def test_if_user_is_anonymous_returns_401(self, api_client):
+        product = baker.make(Product)
+
+        res = api_client.post(f'/store/products/{product.id}/like/')
+
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_if_product_does_not_exist_returns_404(self, like):
+        res = like(Product(id=1))
+
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_if_user_likes_twice_count_grows_once(self, like):
+        product = baker.make(Product)
+        user = baker.make(User)
+
+        like(product, user=user)
+        res = like(product, user=user)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.data == {'liked': True, 'likes': 1}
+        assert LikedItem.objects.count() == 1
+
+    def test_if_user_unlikes_count_shrinks(self, like):
+        product = baker.make(Product)
+        user = baker.make(User)
+        like(product)
+        like(product, user=user)
+
+        res = like(product, 'delete', user=user)
+
+        assert res.data == {'liked': False, 'likes': 1}
+
+
+@pytest.mark.django_db
+class TestLikeCounts:
+    def test_if_likes_are_buffered_counts_are_written_on_flush(self, like):
+        product = baker.make(Product)
+        for _ in range(3):
+            like(product)
+        assert not LikeCount.objects.exists()
+
+        flush_like_counts()
+
+        assert LikeCount.objects.get(object_id=product.id).count == 3
+        assert counters.pending(Product, [product.id]) == {product.id: 0}
+        assert LikeCount.objects.get_counts(Product, [product.id]) == {product.id: 3}
+
+    def test_if_flushed_count_is_liked_again_pending_delta_is_added(self, like):
+        product = baker.make(Product)
+        like(product)
+        flush_like_counts()
+
+        like(product)
+
+        assert LikeCount.objects.get_counts(Product, [product.id]) == {product.id: 2}
+        flush_like_counts()
+        assert LikeCount.objects.get(object_id=product.id).count == 2
+
+    def test_if_products_are_listed_counts_take_one_query(self, api_client, like, settings):
+        products = baker.make(Product, _quantity=3)
+        like(products[0])
+        like(products[0])
+        flush_like_counts()
+        like(products[1])
+
+        for fast in [False, True]:
+            settings.FAST_READ_SERIALIZERS = fast
+            res = api_client.get('/store/products/?ordering=last_update')
+            assert [product['likes'] for product in res.data['results']] == [2, 1, 0]
+
+    def test_if_counts_are_flushed_product_cache_is_invalidated(
+            self, api_client, like, django_capture_on_commit_callbacks):
+        product = baker.make(Product)
+        api_client.get(f'/store/products/{product.id}/')
+
+        like(product)
+        with django_capture_on_commit_callbacks(execute=True):
+            flush_like_counts()
+        res = api_client.get(f'/store/products/{product.id}/')
+
+        assert res.data['likes'] == 1
+
+    def test_if_flush_runs_before_entry_is_written_like_is_flushed_later(self):
+        product = baker.make(Product)
+        # What record() has done when it is interrupted after taking its
+        # sequence number
+        counters.incr(counters.delta_key('my_store.product', product.id), 1)
+        seq = counters.incr(counters.SEQUENCE_KEY, 1)
+
+        flush_like_counts()
+        cache.set(counters.pending_key(seq), ('my_store.product', product.id))
+        flush_like_counts()
+
+        assert LikeCount.objects.get(object_id=product.id).count == 1
+
+    def test_if_entry_is_never_written_flush_skips_it_next_time(self, like):
+        product = baker.make(Product)
+        counters.incr(counters.SEQUENCE_KEY, 1)
+        like(product)
+
+        flush_like_counts()
+        assert not LikeCount.objects.exists()
+        flush_like_counts()
+
+        assert LikeCount.objects.get(object_id=product.id).count == 1
+
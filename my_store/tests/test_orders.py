@@ -0,0 +1,342 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from kombu.exceptions import OperationalError
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+import pytest
+from model_bakery import baker
+from my_store.models import Cart, CartItem, Customer, Order, OrderEvent, OrderItem, Product
+from my_store.serializers import CreateOrderSerializer, OrderSerializer
+from my_store.signals import order_created
+from my_store.tasks import dispatch_order_events
+
+User = get_user_model()
+
+
+@pytest.fixture
+def create_orders():
+    def do_create_orders(quantity, items=3):
+        # Saving a user creates its customer through a signal
+        customer = baker.make(User).customer
+        for order in baker.make(Order, customer=customer, _quantity=quantity):
+            baker.make(OrderItem, order=order, unit_price=1,
+                       product__unit_price=1, _quantity=items)
+    return do_create_orders
+
+
+@pytest.fixture
+def count_queries(api_client):
+    def do_count_queries(url):
+        with CaptureQueriesContext(connection) as queries:
+            res = api_client.get(url)
+        assert res.status_code == status.HTTP_200_OK
+        return len(queries)
+    return do_count_queries
+
+
+@pytest.mark.django_db
+class TestListOrders:
+    @pytest.mark.parametrize('fast', [False, True])
+    def test_if_page_grows_query_count_is_constant(self, authenticate, settings, create_orders, count_queries, fast):
+        settings.FAST_READ_SERIALIZERS = fast
+        authenticate(is_staff=True)
+        create_orders(1)
+        # Caches the table's row estimate, which later requests reuse
+        count_queries('/store/orders/')
+        create_orders(1)
+        two_orders = count_queries('/store/orders/')
+
+        create_orders(8, items=5)
+        ten_orders = count_queries('/store/orders/')
+
+        assert ten_orders == two_orders
+
+    def test_if_list_is_read_again_count_is_cached(self, api_client, authenticate, create_orders):
+        authenticate(is_staff=True)
+        create_orders(2)
+        api_client.get('/store/orders/')
+
+        with CaptureQueriesContext(connection) as queries:
+            res = api_client.get('/store/orders/')
+
+        assert res.data['count'] == 2
+        assert not [q for q in queries if 'COUNT(' in q['sql']]
+
+    def test_if_order_is_created_cached_count_is_invalidated(
+            self, api_client, authenticate, create_orders, django_capture_on_commit_callbacks):
+        authenticate(is_staff=True)
+        create_orders(2)
+        api_client.get('/store/orders/')
+
+        with django_capture_on_commit_callbacks(execute=True):
+            create_orders(1)
+        res = api_client.get('/store/orders/')
+
+        assert res.data['count'] == 3
+
+    def test_if_order_is_retrieved_items_are_prefetched(self, authenticate, create_orders, count_queries):
+        authenticate(is_staff=True)
+        create_orders(1, items=5)
+        order = Order.objects.get()
+
+        # order, items joined with their products
+        assert count_queries(f'/store/orders/{order.id}/') == 2
+
+    def test_if_customer_pages_by_cursor_customer_is_looked_up_once(self, api_client):
+        user = baker.make(User)
+        baker.make(Order, customer=user.customer, _quantity=2)
+        api_client.force_authenticate(user=user)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = api_client.get('/store/orders/?pagination=cursor')
+
+        assert res.status_code == status.HTTP_200_OK
+        assert len([q for q in queries if 'my_store_customer' in q['sql']
+                    and 'my_store_order' not in q['sql']]) == 1
+
+
+@pytest.fixture
+def create_cart(api_client):
+    def do_create_cart(*items):
+        user = baker.make(User)
+        api_client.force_authenticate(user=user)
+        cart = baker.make(Cart)
+        for product, quantity in items:
+            baker.make(CartItem, cart=cart, product=product, quantity=quantity)
+        return cart
+    return do_create_cart
+
+
+@pytest.fixture
+def checkout(api_client, create_cart):
+    def do_checkout(*items):
+        cart = create_cart(*items)
+        return api_client.post('/store/orders/', {'cart_id': cart.id}), cart
+    return do_checkout
+
+
+@pytest.mark.django_db
+class TestCreateOrder:
+    def test_if_stock_is_available_inventory_is_reserved(self, checkout):
+        keyboard = baker.make(Product, unit_price=1, inventory=5)
+        mouse = baker.make(Product, unit_price=1, inventory=2)
+
+        res, cart = checkout((keyboard, 5), (mouse, 1))
+
+        assert res.status_code == status.HTTP_200_OK
+        assert list(Product.objects.order_by('id').values_list('inventory', flat=True)) == [0, 1]
+        assert not Cart.objects.filter(pk=cart.pk).exists()
+
+    def test_if_stock_is_short_returns_400_and_changes_nothing(self, checkout):
+        keyboard = baker.make(Product, unit_price=1, inventory=5)
+        mouse = baker.make(Product, title='Mouse', unit_price=1, inventory=2)
+
+        res, cart = checkout((keyboard, 1), (mouse, 3))
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert res.data['cart_id'] == ['Not enough inventory for: Mouse']
+        assert list(Product.objects.order_by('id').values_list('inventory', flat=True)) == [5, 2]
+        assert not Order.objects.exists()
+        assert Cart.objects.filter(pk=cart.pk).exists()
+
+    def test_if_cart_is_checked_out_twice_second_order_fails(self, create_cart):
+        keyboard = baker.make(Product, unit_price=1, inventory=10)
+        cart = create_cart((keyboard, 3))
+        user_id = baker.make(User).id
+        first, second = [
+            CreateOrderSerializer(data={'cart_id': cart.id}, context={'user_id': user_id})
+            for _ in range(2)]
+        assert first.is_valid() and second.is_valid()
+
+        first.save()
+        with pytest.raises(ValidationError):
+            second.save()
+
+        assert Order.objects.count() == 1
+        keyboard.refresh_from_db()
+        assert keyboard.inventory == 7
+
+    def test_if_cart_grows_query_count_is_constant(self, api_client, create_cart):
+        def count_checkout_queries(size):
+            products = baker.make(Product, unit_price=1, inventory=10, _quantity=size)
+            cart = create_cart(*[(product, 1) for product in products])
+            with CaptureQueriesContext(connection) as queries:
+                res = api_client.post('/store/orders/', {'cart_id': cart.id})
+            assert res.status_code == status.HTTP_200_OK
+            assert len(res.data['items']) == size
+            return len(queries)
+
+        assert count_checkout_queries(10) == count_checkout_queries(1)
+
+    def test_if_order_is_created_response_matches_stored_order(self, checkout):
+        keyboard = baker.make(Product, unit_price=1, inventory=5)
+        mouse = baker.make(Product, unit_price=2, inventory=5)
+
+        res, cart = checkout((keyboard, 2), (mouse, 1))
+
+        assert res.data == OrderSerializer(Order.objects.get(pk=res.data['id'])).data
+
+
+@pytest.fixture
+def order_created_receiver():
+    calls = []
+
+    def receiver(sender, **kwargs):
+        calls.append(kwargs['order'].id)
+    order_created.connect(receiver)
+    yield calls
+    order_created.disconnect(receiver)
+
+
+@pytest.mark.django_db
+class TestOrderEvents:
+    def test_if_order_is_created_event_is_dispatched_after_commit(self, checkout, order_created_receiver, django_capture_on_commit_callbacks):
+        product = baker.make(Product, unit_price=1, inventory=1)
+
+        with django_capture_on_commit_callbacks(execute=False) as callbacks:
+            res, _ = checkout((product, 1))
+        assert order_created_receiver == []
+
+        for callback in callbacks:
+            callback()
+        assert order_created_receiver == [res.data['id']]
+        assert OrderEvent.objects.get().dispatched_at is not None
+
+    def test_if_receiver_fails_event_stays_pending(self, settings):
+        settings.ORDER_EVENTS_MAX_ATTEMPTS = 3
+        event = baker.make(OrderEvent, event=OrderEvent.EVENT_CREATED,
+                           order__customer=baker.make(User).customer)
+
+        def failing_receiver(sender, **kwargs):
+            raise RuntimeError('mail server down')
+        order_created.connect(failing_receiver)
+        try:
+            # Eager mode runs the retries inline until attempts run out
+            dispatch_order_events.delay()
+        finally:
+            order_created.disconnect(failing_receiver)
+
+        event.refresh_from_db()
+        assert event.dispatched_at is None
+        assert event.attempts == 3
+
+    def test_if_broker_is_down_checkout_succeeds_and_event_stays_pending(
+            self, checkout, monkeypatch, django_capture_on_commit_callbacks):
+        def broker_down():
+            raise OperationalError('connection refused')
+        monkeypatch.setattr(dispatch_order_events, 'delay', broker_down)
+        product = baker.make(Product, unit_price=1, inventory=1)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            res, _ = checkout((product, 1))
+
+        assert res.status_code == status.HTTP_200_OK
+        assert OrderEvent.objects.get().dispatched_at is None
+
+    def test_if_receivers_run_event_is_already_claimed(self):
+        event = baker.make(OrderEvent, event=OrderEvent.EVENT_CREATED,
+                           order__customer=baker.make(User).customer)
+        claims = []
+
+        def receiver(sender, **kwargs):
+            claims.append(OrderEvent.objects.get(pk=event.pk).claimed_until)
+        order_created.connect(receiver)
+        try:
+            dispatch_order_events.delay()
+        finally:
+            order_created.disconnect(receiver)
+
+        event.refresh_from_db()
+        assert claims[0] is not None
+        assert event.claimed_until is None
+        assert event.dispatched_at is not None
+
+    def test_if_event_is_claimed_by_another_worker_it_is_skipped(self):
+        baker.make(OrderEvent, event=OrderEvent.EVENT_CREATED,
+                   order__customer=baker.make(User).customer,
+                   claimed_until=timezone.now() + timedelta(minutes=5))
+
+        assert dispatch_order_events.delay().get() == 0
+
+
+@pytest.mark.django_db
+class TestCustomerOrderStats:
+    def test_if_order_is_placed_orders_count_is_incremented(self, api_client, checkout):
+        keyboard = baker.make(Product, unit_price=10, inventory=5)
+
+        res, cart = checkout((keyboard, 2))
+
+        customer = Customer.objects.get(pk=res.data['customer'])
+        assert customer.orders_count == 1
+        assert customer.total_spent == 0
+        res = api_client.get('/store/customers/me/')
+        assert res.data['orders_count'] == 1
+
+    def test_if_payment_status_changes_total_spent_follows(self, api_client):
+        api_client.force_authenticate(user=User(is_staff=True))
+        customer = baker.make(User).customer
+        order = baker.make(Order, customer=customer)
+        baker.make(OrderItem, order=order, unit_price=Decimal('2.50'), quantity=4)
+
+        def patch(payment_status):
+            res = api_client.patch(f'/store/orders/{order.id}/',
+                                   {'payment_status': payment_status})
+            assert res.status_code == status.HTTP_200_OK
+            customer.refresh_from_db()
+            return customer.total_spent
+
+        assert patch(Order.PAYMENT_STATUS_COMPLETE) == Decimal('10.00')
+        assert patch(Order.PAYMENT_STATUS_COMPLETE) == Decimal('10.00')
+        assert patch(Order.PAYMENT_STATUS_FAILED) == 0
+        assert customer.orders_count == 1
+
+    def test_if_order_is_created_complete_total_spent_counts_its_items(self):
+        customer = baker.make(User).customer
+        order = baker.make(Order, customer=customer,
+                           payment_status=Order.PAYMENT_STATUS_COMPLETE)
+        baker.make(OrderItem, order=order, unit_price=3, quantity=2)
+
+        customer.refresh_from_db()
+        assert customer.total_spent == 6
+
+    def test_if_item_of_complete_order_is_edited_total_spent_follows(self):
+        customer = baker.make(User).customer
+        order = baker.make(Order, customer=customer,
+                           payment_status=Order.PAYMENT_STATUS_COMPLETE)
+        item = baker.make(OrderItem, order=order, unit_price=3, quantity=2)
+
+        item.quantity = 5
+        item.save()
+
+        customer.refresh_from_db()
+        assert customer.total_spent == 15
+
+    def test_if_complete_order_is_deleted_stats_are_decremented(self):
+        customer = baker.make(User).customer
+        order = baker.make(Order, customer=customer,
+                           payment_status=Order.PAYMENT_STATUS_COMPLETE)
+        baker.make(OrderItem, order=order, unit_price=3, quantity=2)
+
+        order.items.all().delete()
+        order.delete()
+
+        customer.refresh_from_db()
+        assert customer.orders_count == 0
+        assert customer.total_spent == 0
+
+    def test_if_stats_drift_recompute_order_stats_fixes_them(self):
+        customer = baker.make(User).customer
+        order = baker.make(Order, customer=customer,
+                           payment_status=Order.PAYMENT_STATUS_COMPLETE)
+        baker.make(OrderItem, order=order, unit_price=3, quantity=2)
+        Customer.objects.update(orders_count=0, total_spent=0)
+
+        Customer.objects.recompute_order_stats([customer.id])
+
+        customer.refresh_from_db()
+        assert customer.orders_count == 1
+        assert customer.total_spent == 6
@@ -0,0 +1,105 @@
+import json
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+import pytest
+from model_bakery import baker
+from my_store.models import Collection, Product
+
+
+def product_row(collection, **fields):
+    return {'title': 'Mug', 'slug': 'mug', 'inventory': 5, 'unit_price': '9.99',
+            'collection': collection.id, **fields}
+
+
+@pytest.fixture
+def bulk_import(api_client, authenticate, django_capture_on_commit_callbacks):
+    def do_bulk_import(rows, ndjson=False):
+        authenticate(is_staff=True)
+        with django_capture_on_commit_callbacks(execute=True):
+            if ndjson:
+                body = '\n'.join(json.dumps(row) for row in rows)
+                return api_client.post('/store/products/bulk/', body,
+                                       content_type='application/x-ndjson')
+            return api_client.post('/store/products/bulk/', rows, format='json')
+    return do_bulk_import
+
+
+@pytest.mark.django_db
+class TestBulkImportProducts:
+    def test_if_user_is_not_admin_returns_403(self, api_client, authenticate):
+        authenticate()
+
+        res = api_client.post('/store/products/bulk/', [], format='json')
+
+        assert res.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_if_rows_are_valid_products_are_created_and_updated(self, bulk_import):
+        old, new = baker.make(Collection, _quantity=2)
+        product = baker.make(Product, collection=old, unit_price=1)
+
+        res = bulk_import([
+            product_row(new, title='Teapot'),
+            {'id': product.id, 'unit_price': '20.00', 'collection': new.id},
+        ])
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.data == {'created': 1, 'updated': 1}
+        product.refresh_from_db()
+        assert (product.unit_price, product.collection_id) == (20, new.id)
+        assert Product.objects.filter(title='Teapot', collection=new).exists()
+        assert [c.products_count for c in Collection.objects.order_by('id')] == [0, 2]
+
+    def test_if_products_are_imported_search_finds_them(self, api_client, bulk_import):
+        bulk_import([product_row(baker.make(Collection), title='Teapot')])
+
+        res = api_client.get('/store/products/?search=teap')
+
+        assert [product['title'] for product in res.data['results']] == ['Teapot']
+
+    def test_if_body_is_ndjson_rows_are_imported(self, bulk_import):
+        collection = baker.make(Collection)
+
+        res = bulk_import([product_row(collection, slug=f'mug-{i}') for i in range(3)],
+                          ndjson=True)
+
+        assert res.data == {'created': 3, 'updated': 0}
+
+    def test_if_any_row_is_invalid_returns_errors_and_writes_nothing(self, bulk_import):
+        collection = baker.make(Collection)
+
+        res = bulk_import([
+            product_row(collection),
+            product_row(collection, unit_price='0'),
+            {**product_row(collection), 'collection': collection.id + 1},
+            {'id': 999, 'title': 'Ghost'},
+            'mug',
+        ])
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert [error['row'] for error in res.data['errors']] == [1, 2, 3, 4]
+        assert 'unit_price' in res.data['errors'][0]['errors']
+        assert 'collection' in res.data['errors'][1]['errors']
+        assert not Product.objects.exists()
+
+    def test_if_rows_grow_query_count_is_constant(self, bulk_import, settings):
+        settings.BULK_IMPORT_BATCH_SIZE = 1000
+        collections = baker.make(Collection, _quantity=3)
+
+        def count_import_queries(size):
+            rows = [product_row(collections[i % 3], slug=f'mug-{i}') for i in range(size)]
+            with CaptureQueriesContext(connection) as queries:
+                assert bulk_import(rows).status_code == status.HTTP_200_OK
+            # The SQLite search index is written with one executemany
+            return len(queries)
+
+        assert count_import_queries(100) == count_import_queries(10)
+
+    def test_if_products_are_imported_list_cache_is_invalidated(self, api_client, bulk_import):
+        collection = baker.make(Collection)
+        api_client.get('/store/products/')
+
+        bulk_import([product_row(collection)])
+        res = api_client.get('/store/products/')
+
+        assert res.data['count'] == 1
@@ -0,0 +1,77 @@
+import csv
+import json
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+import pytest
+from model_bakery import baker
+from my_store.models import Collection, Product, ProductImage, Promotion
+
+
+@pytest.fixture
+def export(api_client, authenticate):
+    def do_export(query=''):
+        authenticate(is_staff=True)
+        res = api_client.get(f'/store/products/export/{query}')
+        assert res.status_code == status.HTTP_200_OK
+        return b''.join(res.streaming_content).decode()
+    return do_export
+
+
+@pytest.mark.django_db
+class TestProductExport:
+    def test_if_user_is_not_admin_returns_403(self, api_client, authenticate):
+        authenticate()
+
+        res = api_client.get('/store/products/export/')
+
+        assert res.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_if_output_is_unknown_returns_400(self, api_client, authenticate):
+        authenticate(is_staff=True)
+
+        res = api_client.get('/store/products/export/?output=xml')
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_if_export_is_ndjson_every_product_is_a_line(self, export, settings):
+        settings.EXPORT_CHUNK_SIZE = 2
+        products = baker.make(Product, unit_price=10, _quantity=5)
+        baker.make(ProductImage, product=products[0], image='my_store/images/a.jpg')
+        products[1].promotions.add(baker.make(Promotion, description='Summer sale'))
+
+        records = [json.loads(line) for line in export().splitlines()]
+
+        assert [record['id'] for record in records] == [p.id for p in products]
+        assert records[0]['images'] == ['http://testserver/media/my_store/images/a.jpg']
+        assert records[1]['promotions'][0]['description'] == 'Summer sale'
+        assert records[2]['unit_price'] == '10.00'
+        assert records[2]['collection']['id'] == products[2].collection_id
+
+    def test_if_filters_are_given_export_honours_them(self, export):
+        collection = baker.make(Collection)
+        baker.make(Product, collection=collection, unit_price=5, _quantity=2)
+        baker.make(Product, collection=collection, unit_price=50)
+        baker.make(Product, unit_price=5)
+
+        rows = list(csv.DictReader(export(
+            f'?output=csv&collection_id={collection.id}&unit_price__lt=10').splitlines()))
+
+        assert len(rows) == 2
+        assert {row['collection_id'] for row in rows} == {str(collection.id)}
+
+    def test_if_catalog_grows_queries_grow_per_batch_only(self, api_client, authenticate, settings):
+        settings.EXPORT_CHUNK_SIZE = 10
+        authenticate(is_staff=True)
+
+        def count_export_queries(size):
+            Product.objects.all().delete()
+            for product in baker.make(Product, _quantity=size):
+                baker.make(ProductImage, product=product, image='my_store/images/a.jpg')
+            with CaptureQueriesContext(connection) as queries:
+                res = api_client.get('/store/products/export/')
+                b''.join(res.streaming_content)
+            return len(queries)
+
+        # products, images and promotions per batch of 10
+        assert count_export_queries(25) == count_export_queries(5) + 2 * 3
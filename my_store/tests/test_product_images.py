@@ -0,0 +1,119 @@
+from io import BytesIO, StringIO
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from rest_framework import status
+import pytest
+from kombu.exceptions import OperationalError
+from model_bakery import baker
+from PIL import Image
+from my_store.models import Product, ProductImage
+from my_store.tasks import generate_image_renditions
+
+
+def make_upload(size=(1200, 600)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, 'PNG')
+    return SimpleUploadedFile('shirt.png', buffer.getvalue(), content_type='image/png')
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.PRODUCT_IMAGE_RENDITIONS = {'thumbnail': (100, 100), 'medium': (800, 800)}
+
+
+@pytest.fixture
+def upload_image(api_client, django_capture_on_commit_callbacks):
+    def do_upload_image(product):
+        with django_capture_on_commit_callbacks(execute=True):
+            return api_client.post(f'/store/products/{product.id}/images/',
+                                   {'image': make_upload()}, format='multipart')
+    return do_upload_image
+
+
+@pytest.mark.django_db
+class TestProductImageRenditions:
+    def test_if_image_is_uploaded_renditions_are_generated(self, upload_image, tmp_path):
+        product = baker.make(Product)
+
+        res = upload_image(product)
+
+        assert res.status_code == status.HTTP_201_CREATED
+        image = ProductImage.objects.get()
+        assert (image.width, image.height) == (1200, 600)
+        assert {name: (r['width'], r['height']) for name, r in image.renditions.items()} == \
+            {'thumbnail': (100, 50), 'medium': (800, 400)}
+        for rendition in image.renditions.values():
+            assert rendition['image'].endswith('.webp')
+            assert (tmp_path / rendition['image']).exists()
+
+    def test_if_broker_is_down_upload_succeeds_without_renditions(self, upload_image, monkeypatch):
+        def broker_down(image_id):
+            raise OperationalError('connection refused')
+        monkeypatch.setattr(generate_image_renditions, 'delay', broker_down)
+        product = baker.make(Product)
+
+        res = upload_image(product)
+
+        assert res.status_code == status.HTTP_201_CREATED
+        assert ProductImage.objects.get().renditions == {}
+
+    def test_if_product_is_retrieved_images_have_rendition_urls(self, api_client, upload_image):
+        product = baker.make(Product)
+        upload_image(product)
+
+        res = api_client.get(f'/store/products/{product.id}/')
+
+        image = res.data['images'][0]
+        assert image['width'] == 1200
+        assert image['renditions']['thumbnail']['url'].startswith('http://testserver/media/')
+        assert image['renditions']['thumbnail']['width'] == 100
+
+    def test_if_image_is_deleted_renditions_are_removed(self, upload_image, tmp_path, django_capture_on_commit_callbacks):
+        product = baker.make(Product)
+        upload_image(product)
+        image = ProductImage.objects.get()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            image.delete()
+
+        assert not any((tmp_path / r['image']).exists() for r in image.renditions.values())
+
+    def test_if_image_is_replaced_size_and_renditions_follow(
+            self, api_client, upload_image, tmp_path, django_capture_on_commit_callbacks):
+        product = baker.make(Product)
+        upload_image(product)
+        old = ProductImage.objects.get()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            res = api_client.patch(f'/store/products/{product.id}/images/{old.id}/',
+                                   {'image': make_upload((50, 900))}, format='multipart')
+
+        assert res.status_code == status.HTTP_200_OK
+        image = ProductImage.objects.get()
+        assert (image.width, image.height) == (50, 900)
+        assert image.renditions['thumbnail']['height'] == 100
+        assert not any((tmp_path / r['image']).exists() for r in old.renditions.values())
+
+    def test_if_image_is_replaced_while_broker_is_down_renditions_are_cleared(
+            self, upload_image, monkeypatch, django_capture_on_commit_callbacks):
+        product = baker.make(Product)
+        upload_image(product)
+        image = ProductImage.objects.get()
+        monkeypatch.setattr(generate_image_renditions, 'delay', lambda image_id: None)
+
+        image.image = make_upload((50, 900))
+        with django_capture_on_commit_callbacks(execute=True):
+            image.save()
+
+        image.refresh_from_db()
+        assert (image.width, image.height, image.renditions) == (None, None, {})
+
+    def test_if_images_have_no_renditions_command_generates_them(self):
+        image = baker.make(ProductImage, image=make_upload((50, 80)))
+        assert image.renditions == {}
+
+        call_command('generate_renditions', stdout=StringIO())
+
+        image.refresh_from_db()
+        assert image.renditions['thumbnail']['height'] == 80
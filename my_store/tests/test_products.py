@@ -0,0 +1,316 @@
+import json
+from base64 import b64encode
+from decimal import Decimal
+from types import SimpleNamespace
+from rest_framework import status
+import pytest
+from model_bakery import baker
+from my_store.caching import get_versions, product_version_key
+from my_store.models import Collection, Product, ProductImage
+from my_store.search import search_products
+from tags.models import TaggedItem
+
+
+@pytest.mark.django_db
+class TestProductCache:
+    def test_if_list_is_cached_returns_200_without_queries(self, api_client, django_assert_num_queries):
+        baker.make(Product, unit_price=10, _quantity=3)
+        api_client.get('/store/products/')
+
+        with django_assert_num_queries(0):
+            res = api_client.get('/store/products/')
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.data['count'] == 3
+
+    def test_if_product_is_saved_version_moves_after_commit(self, django_capture_on_commit_callbacks):
+        product = baker.make(Product, unit_price=10)
+        key = product_version_key(product.id)
+        [before] = get_versions([key])
+
+        with django_capture_on_commit_callbacks(execute=True):
+            product.save()
+            # A read before the commit still sees the old row, so it must
+            # not be cached under a new version
+            assert get_versions([key]) == [before]
+
+        assert get_versions([key]) == [before + 1]
+
+    def test_if_product_is_updated_detail_is_invalidated(self, api_client, django_capture_on_commit_callbacks):
+        product = baker.make(Product, unit_price=10)
+        api_client.get(f'/store/products/{product.id}/')
+
+        product.title = 'changed'
+        with django_capture_on_commit_callbacks(execute=True):
+            product.save()
+        res = api_client.get(f'/store/products/{product.id}/')
+
+        assert res.data['title'] == 'changed'
+
+    def test_if_image_is_added_collection_list_is_invalidated(
+            self, api_client, django_capture_on_commit_callbacks):
+        product = baker.make(Product, unit_price=10)
+        url = f'/store/products/?collection_id={product.collection_id}'
+        api_client.get(url)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            baker.make(ProductImage, product=product)
+        res = api_client.get(url)
+
+        assert len(res.data['results'][0]['images']) == 1
+
+    def test_if_product_moves_collection_old_list_is_invalidated(
+            self, api_client, django_capture_on_commit_callbacks):
+        product = baker.make(Product, unit_price=10)
+        url = f'/store/products/?collection_id={product.collection_id}'
+        api_client.get(url)
+
+        product.collection = baker.make(Collection)
+        with django_capture_on_commit_callbacks(execute=True):
+            product.save()
+        res = api_client.get(url)
+
+        assert res.data['count'] == 0
+
+
+    def test_if_host_differs_cached_links_follow_it(self, api_client, settings):
+        settings.ALLOWED_HOSTS = ['*']
+        baker.make(Product, unit_price=10, _quantity=11)
+        api_client.get('/store/products/', HTTP_HOST='shop.example.com')
+
+        res = api_client.get('/store/products/', HTTP_HOST='other.example.com', secure=True)
+
+        assert res.data['next'].startswith('https://other.example.com/')
+
+@pytest.mark.django_db
+class TestProductCursorPagination:
+    def test_if_cursor_mode_walks_every_product_once(self, api_client):
+        baker.make(Product, unit_price=10, title='same', _quantity=25)
+        url = '/store/products/?pagination=cursor'
+        seen = []
+
+        while url:
+            res = api_client.get(url)
+            seen += [product['id'] for product in res.data['results']]
+            url = res.data['next']
+
+        assert len(seen) == 25
+        assert seen == sorted(seen)
+
+    def test_if_cursor_mode_skips_count(self, api_client):
+        baker.make(Product, unit_price=10, _quantity=3)
+
+        res = api_client.get('/store/products/?pagination=cursor')
+
+        assert res.status_code == status.HTTP_200_OK
+        assert 'count' not in res.data
+
+    def test_if_previous_link_returns_previous_page(self, api_client):
+        for price in range(1, 16):
+            baker.make(Product, unit_price=price)
+        url = '/store/products/?pagination=cursor&ordering=-unit_price'
+        first = api_client.get(url)
+
+        second = api_client.get(first.data['next'])
+        previous = api_client.get(second.data['previous'])
+
+        assert [p['unit_price'] for p in second.data['results']] == \
+            [5, 4, 3, 2, 1]
+        assert previous.data['results'] == first.data['results']
+
+    def test_if_cursor_is_invalid_returns_404(self, api_client):
+        res = api_client.get('/store/products/?pagination=cursor&cursor=bad')
+
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_if_cursor_value_does_not_fit_ordering_returns_404(self, api_client):
+        cursor = b64encode(json.dumps({'v': 'abc', 'id': 1, 'r': False}).encode()).decode()
+
+        res = api_client.get('/store/products/', {
+            'pagination': 'cursor', 'ordering': 'unit_price', 'cursor': cursor})
+
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestProductPageCounts:
+    def test_if_count_is_false_count_is_omitted(self, api_client):
+        baker.make(Product, unit_price=10, _quantity=11)
+
+        first = api_client.get('/store/products/?count=false')
+        second = api_client.get(first.data['next'])
+
+        assert 'count' not in first.data
+        assert len(first.data['results']) == 10
+        assert len(second.data['results']) == 1
+        assert second.data['next'] is None
+        assert second.data['previous'] is not None
+
+    def test_if_page_is_past_the_end_without_count_returns_404(self, api_client):
+        baker.make(Product, unit_price=10)
+
+        res = api_client.get('/store/products/?count=false&page=2')
+
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_if_table_is_above_threshold_count_is_estimated(self, api_client, settings, monkeypatch):
+        settings.PAGINATION_ESTIMATE_THRESHOLD = 100
+        monkeypatch.setattr('my_store.pagination.table_row_estimate', lambda model, using: 500)
+        baker.make(Product, unit_price=10, _quantity=3)
+
+        res = api_client.get('/store/products/')
+
+        assert res.data['count'] == 500
+        assert len(res.data['results']) == 3
+        assert res.data['next'] is None
+
+    def test_if_list_is_filtered_count_is_exact(self, api_client, settings, monkeypatch):
+        settings.PAGINATION_ESTIMATE_THRESHOLD = 100
+        monkeypatch.setattr('my_store.pagination.table_row_estimate', lambda model, using: 500)
+        product = baker.make(Product, unit_price=10)
+        baker.make(Product, unit_price=10, _quantity=2)
+
+        res = api_client.get(f'/store/products/?collection_id={product.collection_id}')
+
+        assert res.data['count'] == 1
+
+    def test_if_table_is_below_threshold_count_is_exact(self, api_client, monkeypatch):
+        monkeypatch.setattr('my_store.pagination.table_row_estimate', lambda model, using: 500)
+        baker.make(Product, unit_price=10, _quantity=3)
+
+        res = api_client.get('/store/products/')
+
+        assert res.data['count'] == 3
+
+
+# Full-text indexes only see committed rows on MySQL
+@pytest.mark.django_db(transaction=True)
+class TestProductSearch:
+    def test_if_search_matches_prefix_of_title_or_description(self, api_client):
+        keyboard = baker.make(Product, unit_price=10, title='Mechanical keyboard')
+        mouse = baker.make(Product, unit_price=10, title='Mouse',
+                           description='Pairs with any keyboard')
+        baker.make(Product, unit_price=10, title='Monitor')
+
+        res = api_client.get('/store/products/?search=keyb')
+
+        assert {p['id'] for p in res.data['results']} == {keyboard.id, mouse.id}
+
+    def test_if_all_words_must_match(self, api_client):
+        baker.make(Product, unit_price=10, title='Red chair')
+        desk = baker.make(Product, unit_price=10, title='Red desk')
+
+        res = api_client.get('/store/products/?search=red desk')
+
+        assert [p['id'] for p in res.data['results']] == [desk.id]
+
+    def test_if_word_is_short_it_still_matches(self, api_client):
+        stand = baker.make(Product, unit_price=10, title='TV stand')
+        baker.make(Product, unit_price=10, title='Bookshelf')
+
+        res = api_client.get('/store/products/?search=tv')
+
+        assert [p['id'] for p in res.data['results']] == [stand.id]
+        assert api_client.get('/store/products/?search=tv sta').data['count'] == 1
+
+    def test_if_word_is_short_mysql_does_not_use_full_text_index(self, monkeypatch):
+        monkeypatch.setattr('my_store.search.connection', SimpleNamespace(vendor='mysql'))
+        stand = baker.make(Product, unit_price=10, title='TV stand')
+
+        products = search_products(Product.objects.all(), ['tv'])
+
+        assert 'MATCH' not in str(products.query)
+        assert list(products) == [stand]
+
+    def test_if_product_is_updated_index_follows(self, api_client):
+        product = baker.make(Product, unit_price=10, title='Lamp')
+
+        product.title = 'Heater'
+        product.save()
+
+        assert api_client.get('/store/products/?search=lamp').data['count'] == 0
+        assert api_client.get('/store/products/?search=heat').data['count'] == 1
+
+    def test_if_product_is_deleted_it_is_not_found(self, api_client):
+        product = baker.make(Product, unit_price=10, title='Lamp')
+
+        product.delete()
+
+        assert api_client.get('/store/products/?search=lamp').data['count'] == 0
+
+
+@pytest.mark.django_db
+class TestProductPriceWithTax:
+    def test_if_collection_has_no_rate_default_rate_is_used(self, api_client):
+        product = baker.make(Product, unit_price='19.99')
+
+        res = api_client.get(f'/store/products/{product.id}/')
+
+        assert res.data['price_with_tax'] == Decimal('21.99')
+
+    def test_if_collection_has_rate_it_overrides_default(self, api_client):
+        collection = baker.make(Collection, tax_rate='0.2')
+        baker.make(Product, unit_price='10.00', collection=collection)
+
+        res = api_client.get('/store/products/')
+
+        assert res.data['results'][0]['price_with_tax'] == Decimal('12.00')
+
+    def test_if_price_is_updated_response_has_new_price_with_tax(self, api_client, authenticate):
+        authenticate(is_staff=True)
+        product = baker.make(Product, unit_price='10.00')
+
+        res = api_client.patch(f'/store/products/{product.id}/',
+                               {'unit_price': '20.00'})
+
+        assert res.data['price_with_tax'] == Decimal('22.00')
+
+    def test_if_price_with_tax_is_half_a_cent_created_and_read_prices_agree(
+            self, api_client, authenticate):
+        authenticate(is_staff=True)
+        collection = baker.make(Collection, tax_rate=None)
+
+        # 1.15 * 1.1 = 1.265
+        created = api_client.post('/store/products/', {
+            'title': 'a', 'slug': 'a', 'inventory': 1, 'unit_price': '1.15',
+            'collection': collection.id})
+        read = api_client.get(f'/store/products/{created.data["id"]}/')
+
+        assert created.data['price_with_tax'] == Decimal('1.27')
+        assert read.data['price_with_tax'] == Decimal('1.27')
+
+
+@pytest.mark.django_db
+class TestProductTags:
+    def test_if_products_are_listed_tags_take_one_query(self, api_client, django_assert_num_queries):
+        products = baker.make(Product, unit_price=10, _quantity=3)
+        for product in products:
+            baker.make(TaggedItem, content_object=product, tag__label=f'tag {product.id}')
+
+        # validator, row estimate, count, products, images, tags, likes
+        with django_assert_num_queries(7):
+            res = api_client.get('/store/products/')
+
+        assert [product['tags'] for product in res.data['results']] == \
+            [[f'tag {product.id}'] for product in sorted(products, key=lambda p: p.title)]
+
+    def test_if_product_is_tagged_detail_is_invalidated(self, api_client, django_capture_on_commit_callbacks):
+        product = baker.make(Product, unit_price=10)
+        assert api_client.get(f'/store/products/{product.id}/').data['tags'] == []
+
+        with django_capture_on_commit_callbacks(execute=True):
+            tagged_item = baker.make(TaggedItem, content_object=product, tag__label='sale')
+        assert api_client.get(f'/store/products/{product.id}/').data['tags'] == ['sale']
+
+        tagged_item.tag.label = 'clearance'
+        with django_capture_on_commit_callbacks(execute=True):
+            tagged_item.tag.save()
+        assert api_client.get(f'/store/products/{product.id}/').data['tags'] == ['clearance']
+
+    def test_if_objects_have_no_tags_get_tags_for_many_returns_empty_lists(self):
+        products = baker.make(Product, _quantity=2)
+        baker.make(TaggedItem, content_object=products[0], tag__label='new')
+
+        tags = TaggedItem.objects.get_tags_for_many(Product, [p.id for p in products])
+
+        assert tags == {products[0].id: ['new'], products[1].id: []}
@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from rest_framework import status
+import pytest
+from model_bakery import baker
+from my_store.models import Cart, CartItem, Collection, Order, OrderItem, Product, ProductImage, Review
+
+User = get_user_model()
+
+
+@pytest.fixture
+def store(api_client):
+    user = baker.make(User, is_staff=True)
+    api_client.force_authenticate(user=user)
+    collection = baker.make(Collection)
+    products = baker.make(Product, collection=collection,
+                          unit_price=5, inventory=100, _quantity=3)
+    for product in products:
+        baker.make(ProductImage, product=product, image='my_store/images/a.jpg')
+        baker.make(Review, product=product, _quantity=2)
+    cart = baker.make(Cart)
+    for product in products:
+        baker.make(CartItem, cart=cart, product=product, quantity=2)
+    order = baker.make(Order, customer=user.customer)
+    for product in products:
+        baker.make(OrderItem, order=order, product=product,
+                   unit_price=5, quantity=1)
+    return {
+        'collection': collection.id,
+        'product': products[0].id,
+        'image': products[0].images.first().id,
+        'review': products[0].reviews.first().id,
+        'cart': cart.id,
+        'cart_item': cart.items.first().id,
+        'order': order.id,
+        'customer': user.customer.id,
+    }
+
+
+# Each request is checked against QUERY_BUDGETS in conftest.py
+ENDPOINTS = [
+    ('get', '/store/products/', None),
+    ('post', '/store/products/', {'title': 'a', 'slug': 'a', 'inventory': 1,
+                                  'unit_price': 1, 'collection': '{collection}'}),
+    ('get', '/store/products/{product}/', None),
+    ('patch', '/store/products/{product}/', {'unit_price': 2}),
+    ('get', '/store/collections/', None),
+    ('post', '/store/collections/', {'title': 'a'}),
+    ('get', '/store/collections/{collection}/', None),
+    ('patch', '/store/collections/{collection}/', {'title': 'b'}),
+    ('get', '/store/products/{product}/reviews/', None),
+    ('post', '/store/products/{product}/reviews/', {'name': 'a', 'description': 'b'}),
+    ('get', '/store/products/{product}/reviews/{review}/', None),
+    ('delete', '/store/products/{product}/reviews/{review}/', None),
+    ('get', '/store/products/{product}/images/', None),
+    ('get', '/store/products/{product}/images/{image}/', None),
+    ('delete', '/store/products/{product}/images/{image}/', None),
+    ('post', '/store/carts/', {}),
+    ('get', '/store/carts/{cart}/', None),
+    ('delete', '/store/carts/{cart}/', None),
+    ('get', '/store/carts/{cart}/items/', None),
+    ('post', '/store/carts/{cart}/items/', {'product_id': '{product}', 'quantity': 1}),
+    ('get', '/store/carts/{cart}/items/{cart_item}/', None),
+    ('patch', '/store/carts/{cart}/items/{cart_item}/', {'quantity': 5}),
+    ('delete', '/store/carts/{cart}/items/{cart_item}/', None),
+    ('get', '/store/orders/', None),
+    ('post', '/store/orders/', {'cart_id': '{cart}'}),
+    ('get', '/store/orders/{order}/', None),
+    ('patch', '/store/orders/{order}/', {'payment_status': 'C'}),
+    ('get', '/store/customers/{customer}/', None),
+    ('put', '/store/customers/{customer}/', {'phone': '1'}),
+    ('get', '/store/customers/me/', None),
+]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('method, url, data', ENDPOINTS)
+def test_endpoint_stays_within_query_budget(api_client, store, method, url, data):
+    if data is not None:
+        data = {key: value.format(**store) if isinstance(value, str) else value
+                for key, value in data.items()}
+
+    res = getattr(api_client, method)(url.format(**store), data, format='json')
+
+    assert res.status_code < status.HTTP_400_BAD_REQUEST
@@ -1,7 +1,7 @@
 from django.urls import path
 from django.urls.conf import include
 from rest_framework_nested import routers
-from . import views
+from . import async_views, views
 
 router = routers.DefaultRouter()
 router.register("products", views.ProductViewSet, basename="products")
@@ -20,5 +20,15 @@ products_router.register(
 carts_router = routers.NestedDefaultRouter(
     router, "carts", lookup="cart")
 carts_router.register('items', views.CartItemViewSet, basename="cart-items")
+async_urlpatterns = [
+    path('async/products/', async_views.product_list),
+    path('async/products/<int:pk>/', async_views.product_detail),
+    path('async/products/<int:product_pk>/reviews/', async_views.review_list),
+    path('async/collections/', async_views.collection_list),
+    path('async/collections/<int:pk>/', async_views.collection_detail),
+    path('async/carts/<uuid:pk>/', async_views.cart_detail),
+]
+
 # URLConf
-urlpatterns = router.urls + products_router.urls + carts_router.urls
+urlpatterns = router.urls + products_router.urls + carts_router.urls + \
+    async_urlpatterns
@@ -1,22 +1,35 @@
-from django.db.models import Count
-from django.http import HttpResponse
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Prefetch
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status
 from rest_framework.decorators import api_view, action
-from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.filters import OrderingFilter
 from rest_framework.generics import ListCreateAPIView
 from rest_framework.mixins import (CreateModelMixin, DestroyModelMixin, UpdateModelMixin,
                                    ListModelMixin, RetrieveModelMixin)
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.parsers import JSONParser
 from rest_framework.permissions import IsAuthenticated, AllowAny, DjangoModelPermissions, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet, ModelViewSet
 
+from likes import counters
+from likes.models import LikeCount, LikedItem
 from my_store.permissions import FullDjangoModelPermissions, IsAdminOrReadOnly, ViewCustomerHistoryPermission
 
+from . import bulk, exports
+from .caching import (ORDERS_VERSION_KEY, PRODUCTS_VERSION_KEY, CachedProductResponseMixin,
+                      collection_version_key, version_validator)
+from .conditional import ConditionalGetMixin
+from .fast_serializers import (FastCartSerializer, FastListMixin, FastOrderSerializer,
+                               FastProductSerializer, FastRetrieveMixin)
 from .filters import ProductFilter
+from .pagination import KeysetPagination
+from .search import ProductSearchFilter
 from .models import Cart, CartItem, Collection, Customer, Order, OrderItem, Product, ProductImage, Review
 from .serializers import (AddCartItemSerializer, CartItemSerializer, CartSerializer,
                           CollectionSerializer, CreateOrderSerializer, CustomerSerializer, OrderSerializer, ProductImageSerializer, ProductSerializer,
@@ -180,11 +193,15 @@ class CollectionList(ListCreateAPIView):
 """
 
 
-class ProductViewSet(ModelViewSet):
-    queryset = Product.objects.prefetch_related('images').all()
+class ProductViewSet(CachedProductResponseMixin, FastListMixin, ModelViewSet):
+    queryset = Product.objects.with_price_with_tax().prefetch_related('images')
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    fast_serializer_class = FastProductSerializer
+    filter_backends = [DjangoFilterBackend,
+                       ProductSearchFilter, OrderingFilter]
     filterset_class = ProductFilter
+    pagination_class = KeysetPagination
+    count_version_keys = [PRODUCTS_VERSION_KEY]
     permission_classes = [IsAdminOrReadOnly]
     search_fields = ["title", "description"]
     ordering_fields = ["unit_price", "last_update"]
@@ -205,6 +222,61 @@ class ProductViewSet(ModelViewSet):
     def get_serializer_context(self):
         return {"request": self.request}
 
+    @action(detail=True, methods=['POST', 'DELETE'], permission_classes=[IsAuthenticated])
+    def like(self, request, pk):
+        product = get_object_or_404(Product.objects.only('id'), pk=pk)
+        content_type = ContentType.objects.get_for_model(Product)
+        if request.method == 'POST':
+            _, changed = LikedItem.objects.get_or_create(
+                user=request.user, content_type=content_type, object_id=product.id)
+            delta = 1
+        else:
+            changed = LikedItem.objects.filter(
+                user=request.user, content_type=content_type, object_id=product.id
+            ).delete()[0] > 0
+            delta = -1
+        if changed:
+            # Buffered; flush_like_counts writes it to LikeCount
+            counters.record(Product, product.id, delta)
+        likes = LikeCount.objects.get_counts(Product, [product.id])[product.id]
+        return Response({'liked': delta > 0, 'likes': likes})
+
+    @action(detail=False, methods=['POST'], permission_classes=[IsAdminUser],
+            parser_classes=[JSONParser, bulk.NDJSONParser])
+    def bulk(self, request):
+        """
+        Creates (rows without "id") or updates (rows with "id") many products
+        from a JSON array or an NDJSON body. All rows or none are written.
+        """
+        rows = request.data
+        if not isinstance(rows, list):
+            return Response({'non_field_errors': ['Expected a list of products.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > settings.BULK_IMPORT_MAX_ROWS:
+            return Response({'non_field_errors': [
+                f'Send at most {settings.BULK_IMPORT_MAX_ROWS} products per request.']},
+                status=status.HTTP_400_BAD_REQUEST)
+        result, errors = bulk.import_products(rows)
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result)
+
+    @action(detail=False, permission_classes=[IsAdminUser])
+    def export(self, request):
+        """
+        Streams every product matching the list filters, as
+        ?output=ndjson (default) or ?output=csv.
+        """
+        output = request.query_params.get('output', 'ndjson')
+        if output not in exports.FORMATS:
+            return Response({'output': [f'Choose one of: {", ".join(exports.FORMATS)}.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+        queryset = self.filter_queryset(self.get_queryset())
+        lines, content_type = exports.export_products(queryset, request, output)
+        response = StreamingHttpResponse(lines, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="products.{output}"'
+        return response
+
     def destroy(self, request, *args, **kwargs):
         if OrderItem.objects.filter(product_id=kwargs["pk"]) > 0:
             return Response(
@@ -224,14 +296,24 @@ class ProductImageViewSet(ModelViewSet):
         return {"product_id": self.kwargs["product_pk"]}
 
 
-class CollectionViewSet(ModelViewSet):
-    queryset = Collection.objects.annotate(
-        products_count=Count("products")).all()
+class CollectionViewSet(ConditionalGetMixin, ModelViewSet):
+    queryset = Collection.objects.all()
     serializer_class = CollectionSerializer
     permission_classes = [IsAdminOrReadOnly]
 
+    # Collection saves and deletes bump the collection's version and the
+    # products version; product writes bump both too, which covers
+    # products_count
+    def get_validator(self):
+        pk = self.kwargs.get('pk')
+        if pk is None:
+            return version_validator([PRODUCTS_VERSION_KEY])
+        if not str(pk).isdigit():
+            return None
+        return version_validator([collection_version_key(pk)])
+
     def destroy(self, request, *args, **kwargs):
-        if Product.objects.filter(collection_id=kwargs["pk"]) > 0:
+        if Product.objects.filter(collection_id=kwargs["pk"]).exists():
             return Response(
                 {
                     "error": "Collection cannot be deleted because it includes one or more products."
@@ -244,6 +326,7 @@ class CollectionViewSet(ModelViewSet):
 class ReviewViewSet(ModelViewSet):
     # queryset = Review.objects.all()
     serializer_class = ReviewSerializer
+    pagination_class = KeysetPagination
 
     # Changing to queryset to match the product id
     def get_queryset(self):
@@ -254,9 +337,11 @@ class ReviewViewSet(ModelViewSet):
         return {"product_id": self.kwargs["product_pk"]}
 
 
-class CartViewSet(RetrieveModelMixin, CreateModelMixin, DestroyModelMixin, GenericViewSet):
-    queryset = Cart.objects.prefetch_related('items__product').all()
+class CartViewSet(FastRetrieveMixin, RetrieveModelMixin, CreateModelMixin, DestroyModelMixin, GenericViewSet):
+    queryset = Cart.objects.with_totals().prefetch_related(Prefetch(
+        'items', queryset=CartItem.objects.with_total_price().select_related('product')))
     serializer_class = CartSerializer
+    fast_serializer_class = FastCartSerializer
 
 
 class CartItemViewSet(ModelViewSet):
@@ -273,7 +358,8 @@ class CartItemViewSet(ModelViewSet):
         return {'cart_id': self.kwargs['cart_pk']}
 
     def get_queryset(self):
-        return CartItem.objects.filter(cart_id=self.kwargs['cart_pk']).select_related('product')
+        return CartItem.objects.with_total_price() \
+            .filter(cart_id=self.kwargs['cart_pk']).select_related('product')
 
 
 class CustomerViewSet(CreateModelMixin, RetrieveModelMixin, UpdateModelMixin, GenericViewSet):
@@ -304,8 +390,11 @@ class CustomerViewSet(CreateModelMixin, RetrieveModelMixin, UpdateModelMixin, Ge
         return Response('OK')
 
 
-class OrderViewSet(ModelViewSet):
+class OrderViewSet(FastListMixin, ModelViewSet):
     http_method_names = ['get', 'post', 'patch', 'delete', 'head', 'options']
+    pagination_class = KeysetPagination
+    count_version_keys = [ORDERS_VERSION_KEY]
+    fast_serializer_class = FastOrderSerializer
 
     def get_permissions(self):
         if self.request.method in ['PATCH', "DELETE"]:
@@ -317,8 +406,7 @@ class OrderViewSet(ModelViewSet):
         serializer = CreateOrderSerializer(data=request.data, context={
                                            'user_id': self.request.user.id})
         serializer.is_valid(raise_exception=True)
-        order = serializer.save()
-        serializer = OrderSerializer(order)
+        serializer.save()
         return Response(serializer.data)
 
     def get_serializer_class(self):
@@ -329,9 +417,12 @@ class OrderViewSet(ModelViewSet):
         return OrderSerializer
 
     def get_queryset(self):
+        prefetch_plan = getattr(
+            self.get_serializer_class().Meta, 'prefetch_plan', [])
+        queryset = Order.objects.prefetch_related(*prefetch_plan)
         user = self.request.user
         if user.is_staff:
-            return Order.objects.all()
+            return queryset.all()
         customer_id = Customer.objects.only(
             'id').get(user_id=user.id)
-        return Order.objects.filter(customer_id=customer_id)
+        return queryset.filter(customer_id=customer_id)
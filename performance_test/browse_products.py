@@ -1,5 +1,9 @@
 from locust import HttpUser, task, between
 from random import randint
+import os
+
+# Set to /store/async to browse through the async views
+READ_PREFIX = os.environ.get('STORE_READ_PREFIX', '/store')
 
 
 class WebsiteUser(HttpUser):
@@ -9,14 +13,14 @@ class WebsiteUser(HttpUser):
     def view_products(self):
         collection_id = randint(2, 6)
         self.client.get(
-            f'/store/products/?collection_id={collection_id}',
+            f'{READ_PREFIX}/products/?collection_id={collection_id}',
             name='/store/products')
 
     @task(4)
     def view_product(self):
         product_id = randint(1, 1000)
         self.client.get(
-            f'/store/products/{product_id}',
+            f'{READ_PREFIX}/products/{product_id}/',
             name='/store/products/:id')
 
     @task(1)
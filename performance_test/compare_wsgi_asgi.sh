@@ -0,0 +1,27 @@
+#!/bin/sh
+# Runs browse_products.py against the sync views under WSGI and the async
+# views under ASGI with the same worker count, and keeps locust's CSV stats
+# (wsgi_stats.csv, asgi_stats.csv) for comparison.
+#
+# Usage: performance_test/compare_wsgi_asgi.sh [users] [duration]
+set -e
+
+USERS=${1:-500}
+DURATION=${2:-1m}
+WORKERS=${WORKERS:-1}
+cd "$(dirname "$0")/.."
+
+run() {
+    name=$1; prefix=$2; shift 2
+    "$@" --workers "$WORKERS" --bind 127.0.0.1:8000 &
+    server=$!
+    sleep 3
+    STORE_READ_PREFIX=$prefix locust -f performance_test/browse_products.py \
+        --headless --users "$USERS" --spawn-rate 50 --run-time "$DURATION" \
+        --host http://127.0.0.1:8000 --csv "performance_test/$name" --only-summary
+    kill $server
+    wait $server 2>/dev/null || true
+}
+
+run wsgi /store gunicorn store.wsgi
+run asgi /store/async gunicorn store.asgi -k uvicorn.workers.UvicornWorker
@@ -0,0 +1,68 @@
+"""
+Times importing products through POST /store/products/bulk/ against
+creating them one request at a time through POST /store/products/.
+Everything is rolled back afterwards.
+
+Run from the project root:
+    python performance_test/import_products.py [rows]
+"""
+import os
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'store.settings.dev')
+
+import django  # noqa: E402
+django.setup()
+
+from django.db import transaction  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+from core.models import User  # noqa: E402
+from my_store.models import Collection  # noqa: E402
+
+
+def make_rows(rows, collection):
+    return [{'title': f'Product {i}', 'slug': f'product-{i}', 'inventory': 10,
+             'unit_price': '19.99', 'collection': collection.id}
+            for i in range(rows)]
+
+
+def timed(function):
+    start = perf_counter()
+    function()
+    return perf_counter() - start
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    # The one-request-per-row baseline is slow; time a sample and extrapolate
+    sample = min(rows, 500)
+    setup_test_environment()
+    client = APIClient()
+    client.force_authenticate(User(is_staff=True))
+
+    with transaction.atomic():
+        collection = Collection.objects.create(title='Benchmark')
+
+        def bulk():
+            res = client.post('/store/products/bulk/', make_rows(rows, collection),
+                              format='json')
+            assert res.status_code == 200, res.data
+
+        def one_by_one():
+            for row in make_rows(sample, collection):
+                assert client.post('/store/products/', row, format='json').status_code == 201
+
+        bulk_seconds = timed(bulk)
+        single_seconds = timed(one_by_one) * rows / sample
+        transaction.set_rollback(True)
+
+    print(f'bulk: {rows} rows in {bulk_seconds:.2f}s ({rows / bulk_seconds:,.0f} rows/sec)')
+    print(f'one per request: {rows} rows in ~{single_seconds:.2f}s '
+          f'({rows / single_seconds:,.0f} rows/sec, from {sample} rows)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Renders the hot read endpoints through the ModelSerializers and through
+my_store.fast_serializers, checks both produce the same JSON and reports
+rows/sec. Uses whatever data is in the configured database.
+
+Run from the project root:
+    python performance_test/read_endpoints.py [repeat]
+"""
+import os
+import sys
+from timeit import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'store.settings.dev')
+
+import django  # noqa: E402
+django.setup()
+
+from django.test.utils import override_settings, setup_test_environment  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+from core.models import User  # noqa: E402
+from my_store.models import Cart  # noqa: E402
+
+DUMMY_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+def endpoints():
+    yield '/store/products/', 'results'
+    yield '/store/orders/', 'results'
+    cart = Cart.objects.order_by('-created_at').first()
+    if cart is not None:
+        yield f'/store/carts/{cart.id}/', 'items'
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    setup_test_environment()
+    client = APIClient()
+    client.force_authenticate(User(is_staff=True))
+
+    for url, rows_key in endpoints():
+        results = {}
+        for fast in [False, True]:
+            with override_settings(FAST_READ_SERIALIZERS=fast, CACHES=DUMMY_CACHE):
+                content = client.get(url).content
+                seconds = timeit(lambda: client.get(url), number=repeat) / repeat
+                rows = max(len(client.get(url).data[rows_key]), 1)
+            results[fast] = content
+            print(f'{url} fast={fast}: {rows / seconds:,.0f} rows/sec')
+        print(f'{url} identical: {results[False] == results[True]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Compares ProductSerializer throughput with the old per-row Decimal(1.1)
+tax calculation against the price_with_tax value annotated by
+Product.objects.with_price_with_tax().
+
+Run from the project root:
+    python performance_test/serialize_products.py [rows]
+"""
+import os
+import sys
+from decimal import Decimal
+from timeit import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'store.settings.dev')
+
+import django  # noqa: E402
+django.setup()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from my_store.models import Collection, Product, ProductImage  # noqa: E402
+from my_store.serializers import ProductSerializer  # noqa: E402
+
+
+class OldProductSerializer(ProductSerializer):
+    def calculate_tax(self, product: Product):
+        return product.unit_price * Decimal(1.1)
+
+
+def make_products(rows):
+    collection = Collection(id=1, title='Benchmark')
+    products = []
+    for id in range(1, rows + 1):
+        product = Product(id=id, title=f'Product {id}', slug=f'product-{id}',
+                          inventory=10, unit_price=Decimal('19.99'),
+                          collection=collection)
+        product.price_with_tax = Decimal('21.99')
+        product._prefetched_objects_cache = {
+            'images': ProductImage.objects.none()}
+        product.tag_labels = []
+        product.likes_count = 0
+        products.append(product)
+    return products
+
+
+def render(serializer_class, products):
+    return JSONRenderer().render(serializer_class(products, many=True).data)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    products = make_products(rows)
+    for name, serializer_class in [('old', OldProductSerializer),
+                                   ('new', ProductSerializer)]:
+        seconds = timeit(lambda: render(serializer_class, products), number=10) / 10
+        print(f'{name}: {rows / seconds:,.0f} rows/sec')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from django.conf import settings
+from django.core.cache import caches
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class CachedHttpClient:
+    """
+    JSON GET client shared by every request in the process.
+
+    - One pooled requests.Session with connect/read timeouts.
+    - Responses are cached for `ttl` seconds. For `stale_ttl` seconds after
+      that the cached value is still returned while one background thread
+      refreshes it (stale-while-revalidate).
+    - Concurrent callers asking for the same uncached URL wait for a single
+      upstream fetch instead of each making their own.
+    """
+
+    def __init__(self, ttl, stale_ttl, timeout, pool_size=10, cache_alias='default'):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.timeout = timeout
+        self.cache_alias = cache_alias
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def cache_key(self, url):
+        return f'http:{url}'
+
+    def get_json(self, url):
+        entry = self.cache.get(self.cache_key(url))
+        if entry is not None:
+            age = time.time() - entry['fetched_at']
+            if age < self.ttl:
+                return entry['data']
+            if age < self.ttl + self.stale_ttl:
+                self.fetch(url, wait=False)
+                return entry['data']
+        return self.fetch(url, wait=True)
+
+    def fetch(self, url, wait):
+        with self._lock:
+            future = self._inflight.get(url)
+            owner = future is None
+            if owner:
+                future = self._inflight[url] = Future()
+
+        if owner:
+            if wait:
+                self._fetch(url, future)
+            else:
+                threading.Thread(target=self._fetch, args=(url, future),
+                                 daemon=True).start()
+        return future.result() if wait else None
+
+    def _fetch(self, url, future):
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+            self.cache.set(self.cache_key(url),
+                           {'data': data, 'fetched_at': time.time()},
+                           self.ttl + self.stale_ttl)
+            future.set_result(data)
+        except Exception as exc:
+            logger.warning('Fetching %s failed: %r', url, exc)
+            future.set_exception(exc)
+        finally:
+            with self._lock:
+                self._inflight.pop(url, None)
+
+
+client = CachedHttpClient(
+    ttl=settings.HTTP_CLIENT_CACHE_TTL,
+    stale_ttl=settings.HTTP_CLIENT_STALE_TTL,
+    timeout=settings.HTTP_CLIENT_TIMEOUT,
+)
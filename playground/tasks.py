@@ -1,10 +1,57 @@
-from time import sleep
+import logging
+from time import perf_counter
 from celery import shared_task
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from my_store.models import Customer
+
+logger = logging.getLogger(__name__)
 
 
 @shared_task
 def notify_customers(message):
-    print('Sending 10k emails...')
-    print(message)
-    sleep(10)
-    print('Emails were successfully sent!')
+    """
+    Streams customer ids and queues one send_notification_chunk task per
+    NOTIFY_CUSTOMERS_CHUNK_SIZE customers.
+    """
+    chunk_size = settings.NOTIFY_CUSTOMERS_CHUNK_SIZE
+    customer_ids = Customer.objects.order_by('id') \
+        .values_list('id', flat=True).iterator(chunk_size=chunk_size)
+
+    chunk, chunks = [], 0
+    for customer_id in customer_ids:
+        chunk.append(customer_id)
+        if len(chunk) == chunk_size:
+            send_notification_chunk.delay(message, chunk)
+            chunk, chunks = [], chunks + 1
+    if chunk:
+        send_notification_chunk.delay(message, chunk)
+        chunks += 1
+
+    logger.info('Queued %s notification chunks', chunks)
+    return chunks
+
+
+@shared_task(bind=True, max_retries=3)
+def send_notification_chunk(self, message, customer_ids):
+    """
+    Sends the message to a chunk of customers over a single SMTP connection.
+    """
+    start = perf_counter()
+    emails = Customer.objects.filter(id__in=customer_ids) \
+        .exclude(user__email='').values_list('user__email', flat=True)
+    messages = [
+        EmailMessage(settings.NOTIFY_CUSTOMERS_SUBJECT, message, to=[email])
+        for email in emails
+    ]
+
+    try:
+        with get_connection() as connection:
+            sent = connection.send_messages(messages)
+    except OSError as exc:
+        raise self.retry(exc=exc, countdown=30)
+
+    seconds = perf_counter() - start
+    logger.info('Sent %s emails in %.2fs (%.0f emails/sec)',
+                sent, seconds, sent / seconds if seconds else sent)
+    return sent
@@ -0,0 +1,92 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from asgiref.sync import async_to_sync
+import pytest
+import requests
+from playground.http_client import CachedHttpClient
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.hits += 1
+        time.sleep(self.server.delay)
+        body = json.dumps({'hits': self.server.hits}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.hits, server.delay = 0, 0.2
+    server.url = f'http://127.0.0.1:{server.server_address[1]}/delay'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestCachedHttpClient:
+    def test_if_callers_are_concurrent_upstream_is_fetched_once(self, upstream):
+        client = CachedHttpClient(ttl=60, stale_ttl=60, timeout=5)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: client.get_json(upstream.url), range(8)))
+
+        assert results == [{'hits': 1}] * 8
+        assert upstream.hits == 1
+
+    def test_if_entry_is_fresh_upstream_is_not_called(self, upstream):
+        client = CachedHttpClient(ttl=60, stale_ttl=60, timeout=5)
+        client.get_json(upstream.url)
+
+        assert client.get_json(upstream.url) == {'hits': 1}
+        assert upstream.hits == 1
+
+    def test_if_entry_is_stale_it_is_served_while_refreshing(self, upstream):
+        client = CachedHttpClient(ttl=0, stale_ttl=60, timeout=5)
+        client.get_json(upstream.url)
+
+        assert client.get_json(upstream.url) == {'hits': 1}
+        time.sleep(upstream.delay * 2)
+        assert upstream.hits == 2
+
+    def test_if_upstream_is_slow_request_times_out(self, upstream):
+        upstream.delay = 1
+        client = CachedHttpClient(ttl=60, stale_ttl=60, timeout=0.1)
+
+        with pytest.raises(requests.Timeout):
+            client.get_json(upstream.url)
+
+
+class TestHelloView:
+    def test_if_upstream_responds_returns_200(self, client, settings, upstream):
+        settings.HELLO_UPSTREAM_URL = upstream.url
+
+        res = client.get('/playground/hello/')
+
+        assert res.status_code == 200
+        assert b"{&#x27;hits&#x27;: 1}" in res.content
+
+    def test_if_async_view_is_used_returns_200(self, async_client, settings, upstream):
+        settings.HELLO_UPSTREAM_URL = upstream.url
+
+        res = async_to_sync(async_client.get)('/playground/hello-async/')
+
+        assert res.status_code == 200
+
+    def test_if_upstream_is_down_returns_503(self, client, settings):
+        settings.HELLO_UPSTREAM_URL = 'http://127.0.0.1:9/'
+
+        res = client.get('/playground/hello/')
+
+        assert res.status_code == 503
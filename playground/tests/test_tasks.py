@@ -0,0 +1,67 @@
+import socketserver
+import threading
+from django.contrib.auth import get_user_model
+import pytest
+from model_bakery import baker
+from playground.tasks import notify_customers
+
+User = get_user_model()
+
+
+class StubSMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for Django's backend; records connections and recipients."""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 stub')
+        for line in self.rfile:
+            command = line.decode().strip().upper()
+            if command.startswith('RCPT'):
+                self.server.recipients += 1
+            if command == 'DATA':
+                self.reply('354 go ahead')
+                for data in self.rfile:
+                    if data == b'.\r\n':
+                        break
+                self.reply('250 queued')
+            elif command == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('250 ok')
+
+
+@pytest.fixture
+def smtp_server(settings):
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), StubSMTPHandler)
+    server.connections = server.recipients = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+    settings.EMAIL_HOST, settings.EMAIL_PORT = server.server_address
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.django_db
+class TestNotifyCustomers:
+    def test_if_customers_exist_each_gets_one_email(self, settings, mailoutbox):
+        settings.NOTIFY_CUSTOMERS_CHUNK_SIZE = 2
+        users = baker.make(User, _quantity=5)
+
+        assert notify_customers.delay('Sale!').get() == 3
+        assert sorted(message.to[0] for message in mailoutbox) == \
+            sorted(user.email for user in users)
+        assert mailoutbox[0].body == 'Sale!'
+
+    def test_if_chunks_are_sent_each_reuses_one_connection(self, settings, smtp_server):
+        settings.NOTIFY_CUSTOMERS_CHUNK_SIZE = 4
+        baker.make(User, _quantity=10)
+
+        notify_customers.delay('Sale!')
+
+        assert smtp_server.recipients == 10
+        assert smtp_server.connections == 3
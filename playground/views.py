@@ -1,3 +1,5 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.shortcuts import render
 from django.core.cache import cache
 from django.views.decorators.cache import cache_page
@@ -5,6 +7,7 @@ from django.utils.decorators import method_decorator
 from rest_framework.views import APIView
 import requests
 import logging
+from .http_client import client
 
 
 # Function based cache view
@@ -28,14 +31,28 @@ class HelloView(APIView):
 logger = logging.getLogger(__name__)
 
 
+def get_hello_data():
+    try:
+        logger.info('Calling HttpBin')
+        data = client.get_json(settings.HELLO_UPSTREAM_URL)
+        logger.info('Received the response')
+        return data
+    except requests.RequestException:
+        logger.critical("HttpBin is offline")
+        return None
+
+
 class HelloView(APIView):
 
     def get(self, request):
-        try:
-            logger.info('Calling HttpBin')
-            res = requests.get('https://httpbin.org/delay/2')
-            logger.info('Received the response')
-            data = res.json()
-        except requests.ConnectionError:
-            logger.critical("HttpBin is offline")
-        return render(request, 'emails/hello.html', {'name': data})
+        data = get_hello_data()
+        status = 200 if data is not None else 503
+        return render(request, 'emails/hello.html', {'name': data}, status=status)
+
+
+# Async variant: the blocking fetch runs in a thread so the event loop keeps
+# serving other requests while the upstream call is in flight
+async def say_hello_async(request):
+    data = await sync_to_async(get_hello_data, thread_sensitive=False)()
+    status = 200 if data is not None else 503
+    return render(request, 'emails/hello.html', {'name': data}, status=status)
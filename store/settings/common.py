@@ -130,6 +130,21 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Resized WebP copies of product images, (max width, max height)
+PRODUCT_IMAGE_RENDITIONS = {
+    'thumbnail': (100, 100),
+    'small': (320, 320),
+    'medium': (800, 800),
+}
+PRODUCT_IMAGE_WEBP_QUALITY = 80
+
+# Rows per query when streaming /store/products/export/
+EXPORT_CHUNK_SIZE = 1000
+
+# POST /store/products/bulk/
+BULK_IMPORT_MAX_ROWS = 20000
+BULK_IMPORT_BATCH_SIZE = 500
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
@@ -177,11 +192,33 @@ CELERY_BROKER_URL = 'redis://localhost:6379/1'
 CELERY_BEAT_SCHEDULE = {
     'notify_customers': {
         'task': 'playground.tasks.notify_customers',
-        'schedule': 5,
+        'schedule': crontab(day_of_week=1, hour=7, minute=0),
         'args': ['Hello World'],
-    }
+    },
+    # Picks up events whose task was lost, e.g. the broker was down on commit
+    'dispatch_order_events': {
+        'task': 'my_store.tasks.dispatch_order_events',
+        'schedule': 60,
+    },
+    'flush_like_counts': {
+        'task': 'likes.tasks.flush_like_counts',
+        'schedule': 30,
+    },
 }
-CACHE = {
+ORDER_EVENTS_BATCH_SIZE = 100
+ORDER_EVENTS_MAX_ATTEMPTS = 10
+# Seconds a worker has to deliver the events it claimed
+ORDER_EVENTS_CLAIM_TIMEOUT = 5 * 60
+LIKE_COUNTS_FLUSH_BATCH_SIZE = 1000
+NOTIFY_CUSTOMERS_CHUNK_SIZE = 500
+NOTIFY_CUSTOMERS_SUBJECT = 'News from Ariun Buy'
+
+# Outbound calls made through playground.http_client.client
+HELLO_UPSTREAM_URL = 'https://httpbin.org/delay/2'
+HTTP_CLIENT_TIMEOUT = (3.05, 10)
+HTTP_CLIENT_CACHE_TTL = 5 * 60
+HTTP_CLIENT_STALE_TTL = 60 * 60
+CACHES = {
     "default": {
         "BACKEND": "django_redis.cache.RedisCache",
         "LOCATION": "redis://127.0.0.1:6379/2",
@@ -192,6 +229,18 @@ CACHE = {
         }
     }
 }
+PRODUCT_CACHE_TIMEOUT = 10 * 60
+
+# Page number pagination counts, see my_store.pagination.KeysetPagination
+PAGINATION_COUNT_CACHE_TIMEOUT = 10 * 60
+# Unfiltered lists of bigger tables report the database's row estimate
+PAGINATION_ESTIMATE_THRESHOLD = 100000
+
+# Serve product/order lists and carts through my_store.fast_serializers
+FAST_READ_SERIALIZERS = True
+
+# Used for products whose collection has no tax_rate of its own
+DEFAULT_TAX_RATE = '0.1'
 
 LOGGING = {
     'version': 1,
@@ -11,6 +11,47 @@ class TaggedItemManager(models.Manager):
             content_type=content_type, object_id=obj_id
         )
 
+    def labels_for_many(self, model, ids):
+        """
+        (object_id, label) pairs for the given objects. The content type is
+        matched with a join rather than looked up first, so this is a single
+        query and safe to iterate from async code.
+        """
+        opts = model._meta
+        return (
+            self.filter(
+                content_type__app_label=opts.app_label,
+                content_type__model=opts.model_name,
+                object_id__in=ids,
+            )
+            .order_by("tag__label")
+            .values_list("object_id", "tag__label")
+        )
+
+    def get_tags_for_many(self, model, ids):
+        tags = {id: [] for id in ids}
+        for object_id, label in self.labels_for_many(model, ids):
+            tags[object_id].append(label)
+        return tags
+
+    async def aget_tags_for_many(self, model, ids):
+        tags = {id: [] for id in ids}
+        async for object_id, label in self.labels_for_many(model, ids):
+            tags[object_id].append(label)
+        return tags
+
+    def prefetch_tags(self, objects, to_attr="tag_labels"):
+        """
+        Sets to_attr on each object to its list of tag labels, with one
+        query for all objects that don't have it yet.
+        """
+        objects = [obj for obj in objects if not hasattr(obj, to_attr)]
+        if not objects:
+            return
+        tags = self.get_tags_for_many(type(objects[0]), [obj.pk for obj in objects])
+        for obj in objects:
+            setattr(obj, to_attr, tags[obj.pk])
+
 
 class Tag(models.Model):
     label = models.CharField(max_length=255)
@@ -25,3 +66,6 @@ class TaggedItem(models.Model):
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
     object_id = models.PositiveIntegerField()
     content_object = GenericForeignKey()
+
+    class Meta:
+        indexes = [models.Index(fields=['content_type', 'object_id'])]